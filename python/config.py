@@ -4,7 +4,39 @@ from python.imports import *
 
 # insert your details to scrape this data from the SEC EDGAR database
 # UA = {"User-Agent": "Name Surname <email@example.com>"}
-BASE = "https://data.sec.gov/api" 
+BASE = os.environ.get("SEC_API_BASE", "https://data.sec.gov/api")
+SUBMISSIONS_BASE = os.environ.get("SEC_SUBMISSIONS_BASE", "https://data.sec.gov/submissions")
+TICKERS_URL = os.environ.get("SEC_TICKERS_URL", "https://www.sec.gov/files/company_tickers.json")
+TICKERS_EXCHANGE_URL = os.environ.get(
+    "SEC_TICKERS_EXCHANGE_URL", "https://www.sec.gov/files/company_tickers_exchange.json"
+)
+SEC_TIMEOUT = 30      # seconds per request before a ReadTimeout retry
+
+# ===============================
+# SEC FAIR ACCESS
+# ===============================
+
+SEC_MAX_RPS = 10      # requests per second allowed by SEC fair-access policy
+SEC_BURST = 1         # token-bucket capacity (1 = evenly spaced requests)
+SCRAPE_WORKERS = 8    # concurrent fetch threads (1 = serial)
+# Host-wide limit: every scraper process on this machine shares one bucket
+SEC_SHARED_LIMIT = True
+SEC_LIMITER_FILE = os.environ.get(
+    "SEC_LIMITER_FILE",
+    os.path.join(os.environ.get("TMPDIR", "/tmp"), "sec_edgar_ratelimit.json"),
+)
+SCRAPE_METHOD = "concept"  # "concept": one request per (ticker × tag); "facts": one per company
+
+# Retries: exponential backoff with jitter on 429 / 5xx / connection errors
+SEC_MAX_RETRIES = 6
+SEC_RETRY_STATUSES = (429, 500, 502, 503, 504)
+SEC_BACKOFF_BASE = 0.5       # seconds; attempt k waits up to base * 2**k
+SEC_BACKOFF_MAX = 60         # cap on a single backoff (and on Retry-After)
+# Circuit breaker: pause every request once SEC starts throttling
+SEC_BREAKER_THRESHOLD = 3    # throttled responses ...
+SEC_BREAKER_WINDOW = 30      # ... within this many seconds open the breaker
+SEC_BREAKER_COOLDOWN = 30    # seconds paused (doubles while throttling persists)
+SEC_BREAKER_MAX_COOLDOWN = 600
 
 # ===============================
 # PATHS
@@ -16,9 +48,62 @@ DATA_RAW = os.path.join(PROJECT_ROOT, "data", "raw")
 DATA_PROCESSED = os.path.join(PROJECT_ROOT, "data", "processed")
 OUTPUTS = os.path.join(PROJECT_ROOT, "outputs")
 
+DATA_SHARDS = os.path.join(DATA_RAW, "shards")  # per-ticker scrape checkpoints
+SCRAPE_METRICS_LOG = os.path.join(DATA_RAW, "scrape_metrics.jsonl")  # per-request telemetry
+
+# Preprocess each ticker while the rest are still being scraped (see run_pipeline)
+STREAM_PIPELINE = False
+STREAM_QUEUE_SIZE = 8  # scraped tickers waiting for preprocessing before the scraper blocks
+
+# run_pipeline hands DataFrames from stage to stage in memory; list the
+# stages whose output should also be saved to disk: "raw", "clean"
+# (the final panel in OUTPUTS is always written)
+PIPELINE_CHECKPOINTS = []
+
+# Let pipeline steps modify the intermediate frames they are handed in place
+# instead of copying them (lower peak memory; see schema.owned_frames)
+COPY_FREE = False
+
 for path in [DATA_RAW, DATA_PROCESSED, OUTPUTS]:
     os.makedirs(path, exist_ok=True)
 
+# Local copy of SEC's nightly bulk archive
+# (https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip)
+COMPANYFACTS_ZIP = os.path.join(PROJECT_ROOT, "data", "bulk", "companyfacts.zip")
+# (https://www.sec.gov/Archives/edgar/daily-index/bulkdata/submissions.zip)
+SUBMISSIONS_ZIP = os.path.join(PROJECT_ROOT, "data", "bulk", "submissions.zip")
+
+# ===============================
+# STORAGE
+# ===============================
+
+STORAGE_FORMAT = "parquet"     # "parquet" (typed, partitioned) or "csv"
+EXPORT_CSV = False             # also write a .csv copy of every dataset
+PARTITION_COLS = ["ticker"]    # Parquet partitioning, e.g. ["ticker", "label"]
+PARQUET_COMPRESSION = "zstd"
+PARQUET_ROW_GROUP = 64_000
+
+# Dataset base paths (no extension; see functions/storage.py)
+RAW_DATASET = os.path.join(DATA_RAW, "financials")
+CLEAN_DATASET = os.path.join(DATA_PROCESSED, "financials_clean")
+OUTPUT_DATASET = os.path.join(OUTPUTS, "data")
+OUTPUT_FEATHER = os.path.join(OUTPUTS, "data.arrow")  # uncompressed Arrow IPC for R (memory-mapped)
+
+# ===============================
+# HTTP CACHE
+# ===============================
+
+CACHE_DIR = os.path.join(PROJECT_ROOT, "data", "cache", "http")
+CACHE_TTL = 24 * 3600                # seconds a cached response is used without revalidation
+CACHE_MAX_AGE = 90 * 24 * 3600       # entries unused for longer than this are evicted
+CACHE_MAX_BYTES = 2 * 1024 ** 3      # size cap, least-recently-used entries evicted first
+SEC_OFFLINE = os.environ.get("SEC_OFFLINE", "0") == "1"  # serve from cache only, never hit SEC
+
+# Which tags exist for which CIK, used to skip requests that would 404
+COVERAGE_INDEX = os.path.join(PROJECT_ROOT, "data", "cache", "coverage.json")
+COVERAGE_TTL = 30 * 24 * 3600        # trust a company's full tag list (from companyfacts) this long
+NEGATIVE_TTL = 7 * 24 * 3600         # skip a (CIK, tag) that returned 404 this long
+
 # ===============================
 # US-GAAP TAG GROUPS 
 # ===============================
@@ -183,6 +268,43 @@ TAG_GROUPS = {
         "debt": debt_tags,
     }
 
+# ---- XBRL frames API ----
+# Frames are requested per (tag, unit, period); most tags are USD durations
+FRAMES_START_YEAR = 2009   # first calendar year requested from the frames API
+FRAME_UNITS = {
+    "eps_basic": "USD-per-shares",
+    "eps_diluted": "USD-per-shares",
+    "shares_basic": "shares",
+    "shares_diluted": "shares",
+}
+# Balance-sheet groups are point-in-time facts (frame suffix "I")
+INSTANT_GROUPS = {
+    "assets", "assets_curr", "liab", "liab_curr",
+    "equity", "cash", "receivables", "debt",
+}
+
+# ===============================
+# INDUSTRY UNIVERSE (SIC)
+# ===============================
+
+# Industries as SIC codes or inclusive ranges ("5400-5499")
+SIC_INDUSTRIES = {
+    "restaurants": ["5812", "5813"],
+    "food_stores": ["5400-5499"],
+    "general_merchandise": ["5300-5399"],
+    "apparel_retail": ["5600-5699"],
+    "home_improvement": ["5200-5299"],
+    "misc_retail": ["5900-5999"],
+    "food_products": ["2000-2099"],
+    "hotels": ["7011"],
+}
+UNIVERSE_INDUSTRIES = ["restaurants"]      # default selection for --industry
+UNIVERSE_EXCHANGES = ["NYSE", "Nasdaq"]    # None keeps OTC and unlisted filers too
+UNIVERSE_SHARDS = 16                       # contiguous CIK ranges, scraped and stored separately
+UNIVERSE_TTL = 30 * 24 * 3600              # SIC codes rarely change; reuse cached submissions this long
+DATA_UNIVERSE = os.path.join(DATA_RAW, "universe")              # one raw dataset per CIK-range shard
+DATA_UNIVERSE_CLEAN = os.path.join(DATA_PROCESSED, "universe")  # preprocessed shards
+
 
 tickers = [
     'MCD',     # McDonald's Corporation
@@ -1,13 +1,53 @@
+from python.config import COPY_FREE, PIPELINE_CHECKPOINTS, STREAM_PIPELINE
+from python.scripts.functions.schema import owned_frames
 from python.scripts.scrapper import scrape
-from python.scripts.preprocess import preprocess
+from python.scripts.preprocess import preprocess, StreamingPreprocessor
 from python.scripts.prepare import prepare
 
+import argparse
 
-def main():
-    scrape()
-    preprocess()
-    prepare()
+
+def main(
+    stream: bool = STREAM_PIPELINE,
+    checkpoints: list[str] = PIPELINE_CHECKPOINTS,
+    copy_free: bool = COPY_FREE,
+):
+    """
+    Run scrape -> preprocess -> prepare, handing each stage's DataFrame to
+    the next in memory. `checkpoints` lists the intermediate stages
+    ("raw", "clean") that are also saved to disk, e.g. to rerun
+    preprocess.py or prepare.py on their own later. With `copy_free`,
+    the steps modify the frames they are handed instead of copying them.
+    """
+
+    unknown = set(checkpoints) - {"raw", "clean"}
+    if unknown:
+        raise ValueError(f"unknown checkpoint stages: {sorted(unknown)}")
+
+    save_raw = "raw" in checkpoints
+    save_clean = "clean" in checkpoints
+
+    with owned_frames(copy_free):
+        if stream:
+            # Preprocess each ticker while the next ones are being scraped
+            with StreamingPreprocessor(save_raw=save_raw, save_clean=save_clean) as pre:
+                scrape(on_ticker=pre.put)
+            clean = pre.result
+        else:
+            # No local reference to the raw frame, so it can be freed mid-preprocess
+            clean = preprocess(scrape(save=save_raw), save=save_clean)
+
+        return prepare(clean)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run the full pipeline.")
+    parser.add_argument("--stream", action="store_true", default=STREAM_PIPELINE, help="preprocess tickers while scraping")
+    parser.add_argument("--copy-free", action="store_true", default=COPY_FREE, help="let steps modify intermediate frames in place")
+    parser.add_argument(
+        "--checkpoint", nargs="*", choices=["raw", "clean"], default=PIPELINE_CHECKPOINTS,
+        help="also save these intermediate stages to disk",
+    )
+    args = parser.parse_args()
+
+    main(stream=args.stream, checkpoints=args.checkpoint, copy_free=args.copy_free)
@@ -0,0 +1,224 @@
+from python.imports import *
+from python.config import *
+from python.scripts.functions.scraping import *
+from python.scripts.functions.standin import *
+from python.scripts.functions.telemetry import reset_metrics
+from python.scripts.functions.columnar import FactTable
+from python.scripts.functions.schema import memory_mb, owned_frames
+from python.scripts.functions.tagging import add_label_from_source_tag
+from python.scripts.preprocess import preprocess_frame
+from python.scripts.prepare import prepare_frame
+
+import python.scripts.functions.http_cache as http_cache
+import python.scripts.functions.scraping as scraping
+
+import argparse
+import gc
+import tempfile
+import tracemalloc
+
+# Collectors that talk to the (stand-in) SEC API
+BENCH_COLLECTORS = {
+    "concept": collect_concepts_long,
+    "facts": collect_facts_long,
+    "frames": collect_frames_long,
+}
+
+# Module globals of functions/scraping.py that run_benchmark repoints
+BENCH_RESTORED_GLOBALS = [
+    "BASE", "SUBMISSIONS_BASE", "TICKERS_URL", "TICKERS_EXCHANGE_URL",
+    "SEC_TIMEOUT", "UA", "_LIMITER", "_BREAKER",
+]
+
+def run_benchmark(
+    methods: list[str] | None = None,
+    n_companies: int = 31,
+    latency: float = 0.05,
+    p404: float = 0.0,
+    p429: float = 0.0,
+    p_timeout: float = 0.0,
+    rps: float = SEC_MAX_RPS,
+    workers: int = SCRAPE_WORKERS,
+    timeout: float = 2.0,
+    frames_start_year: int = 2023,
+    breaker_cooldown: float = SEC_BREAKER_COOLDOWN,
+) -> pd.DataFrame:
+    """
+    Run each collector against a local SEC stand-in server and report
+    end-to-end time, request throughput, retry behaviour and the
+    network / rate-limiter / parsing split from the scrape telemetry.
+
+    Every collector starts from an empty, throwaway HTTP cache and a
+    process-local rate limiter of `rps` requests per second.
+    """
+
+    methods = methods or list(BENCH_COLLECTORS)
+    data = SyntheticEdgar(n_companies=n_companies)
+    bench_tickers = [v["ticker"] for v in data.tickers().values()]
+    tags = sorted({tag for group in TAG_GROUPS.values() for tag in group})
+
+    # Scraper state changed below, restored on return (or on error) so a
+    # later scrape in this process talks to the real SEC again
+    saved = {name: vars(scraping)[name] for name in BENCH_RESTORED_GLOBALS if name in vars(scraping)}
+    saved_cache_dir = http_cache.CACHE_DIR
+
+    try:
+        if "UA" not in saved:
+            scraping.UA = {"User-Agent": "scraper benchmark <benchmark@localhost>"}
+
+        scraping.SEC_TIMEOUT = timeout
+        set_rate_limit(rps, shared=False)
+        set_pool_size(workers)
+
+        results = []
+
+        with StandinServer(
+            data, latency=latency, p404=p404, p429=p429,
+            p_timeout=p_timeout, hang=2 * timeout,
+        ) as server:
+            set_sec_host(server.url)
+
+            for method in methods:
+                kwargs = {"max_workers": workers}
+                if method == "frames":
+                    kwargs["start_year"] = frames_start_year
+
+                with tempfile.TemporaryDirectory() as cache_dir:
+                    set_cache_dir(cache_dir)
+                    server.reset_counts()
+                    metrics = reset_metrics()
+                    set_circuit_breaker(cooldown=breaker_cooldown)
+
+                    error = None
+                    t0 = time.perf_counter()
+                    try:
+                        rows = len(BENCH_COLLECTORS[method](bench_tickers, tags, **kwargs))
+                    except Exception as e:
+                        rows, error = 0, f"{type(e).__name__}: {e}"
+                    elapsed = time.perf_counter() - t0
+
+                    by_status = Counter()
+                    for (_, status), n in server.counts.items():
+                        by_status[status] += n
+                    n_requests = sum(by_status.values())
+                    m = metrics.summary()
+
+                    results.append({
+                        "method": method,
+                        "seconds": round(elapsed, 2),
+                        "requests": n_requests,
+                        "req_per_s": round(n_requests / elapsed, 1) if elapsed else None,
+                        "rows": rows,
+                        "retries": sum(n - 1 for n in server.paths.values()),
+                        "http_404": by_status[404],
+                        "http_429": by_status[429],
+                        "hangs": server.hangs,
+                        "mb": round(server.bytes_sent / 1e6, 2),
+                        "network_s": round(m["network_seconds"], 2),
+                        "limiter_s": round(m["sleep_seconds"].get("rate_limit", 0.0), 2),
+                        "backoff_s": round(m["sleep_seconds"].get("backoff", 0.0), 2),
+                        "breaker_s": round(m["sleep_seconds"].get("circuit_breaker", 0.0), 2),
+                        "parse_s": round(m["parse_seconds"], 2),
+                        "error": error,
+                    })
+
+    finally:
+        for name in BENCH_RESTORED_GLOBALS:
+            if name in saved:
+                setattr(scraping, name, saved[name])
+            elif name in vars(scraping):
+                delattr(scraping, name)
+
+        set_cache_dir(saved_cache_dir)
+        set_pool_size(SCRAPE_WORKERS)
+
+    return pd.DataFrame(results)
+
+
+def run_memory_benchmark(n_companies: int = 200) -> pd.DataFrame:
+    """
+    Peak memory of preprocessing + SCM preparation on a synthetic raw
+    table, in the default mode (every step copies its input) and in
+    copy-free mode (see schema.owned_frames).
+
+    Peak is measured with tracemalloc, which also tracks NumPy / pandas
+    buffers, and counts memory allocated on top of the raw frame. The
+    raw frame is handed over without another reference, as in
+    run_pipeline, so it can be freed once the pipeline is done with it.
+    Timings are taken under tracing and are only comparable to each other.
+    """
+
+    data = SyntheticEdgar(n_companies=n_companies)
+    tags = sorted({tag for group in TAG_GROUPS.values() for tag in group})
+
+    # Decode the companyfacts payloads directly, no server needed
+    table = FactTable()
+    for i, company in enumerate(data.tickers().values()):
+        j = data.facts(company["cik_str"])
+        scraping._append_facts(table, j, tags, "us-gaap", company["ticker"], chunk=i)
+
+    results = []
+
+    for mode, copy_free in [("copy", False), ("copy_free", True)]:
+        raw = [add_label_from_source_tag(table.to_frame())]
+        rows, raw_mb = len(raw[0]), memory_mb(raw[0])
+        gc.collect()
+
+        tracemalloc.start()
+        t0 = time.perf_counter()
+
+        with owned_frames(copy_free):
+            panel = prepare_frame(preprocess_frame(raw.pop()))
+
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results.append({
+            "mode": mode,
+            "raw_rows": rows,
+            "raw_mb": round(raw_mb, 1),
+            "peak_mb": round(peak / 1e6, 1),
+            "seconds": round(elapsed, 2),
+            "panel_rows": len(panel),
+        })
+
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the SEC collectors against a local stand-in server.")
+    parser.add_argument("--methods", nargs="+", choices=sorted(BENCH_COLLECTORS), default=None)
+    parser.add_argument("--companies", type=int, default=31)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean seconds per response")
+    parser.add_argument("--p404", type=float, default=0.0, help="extra share of 404 responses")
+    parser.add_argument("--p429", type=float, default=0.0, help="share of 429 throttling responses")
+    parser.add_argument("--p-timeout", type=float, default=0.0, help="share of requests that hang past the timeout")
+    parser.add_argument("--rps", type=float, default=SEC_MAX_RPS, help="client rate limit")
+    parser.add_argument("--workers", type=int, default=SCRAPE_WORKERS)
+    parser.add_argument("--breaker-cooldown", type=float, default=SEC_BREAKER_COOLDOWN,
+                        help="seconds all requests pause once throttling trips the circuit breaker")
+    parser.add_argument("--memory", action="store_true",
+                        help="compare peak memory of preprocessing with and without copy-free mode instead")
+    parser.add_argument("--out", default=None, help="optional CSV path for the results")
+    args = parser.parse_args()
+
+    if args.memory:
+        report = run_memory_benchmark(n_companies=args.companies)
+    else:
+        report = run_benchmark(
+            methods=args.methods,
+            n_companies=args.companies,
+            latency=args.latency,
+            p404=args.p404,
+            p429=args.p429,
+            p_timeout=args.p_timeout,
+            rps=args.rps,
+            workers=args.workers,
+            breaker_cooldown=args.breaker_cooldown,
+        )
+
+    print(report.to_string(index=False))
+
+    if args.out:
+        report.to_csv(args.out, index=False)
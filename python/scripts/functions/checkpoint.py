@@ -0,0 +1,118 @@
+from python.imports import *
+from python.config import *
+from python.scripts.functions.schema import concat_facts
+from python.scripts.functions.storage import read_dataset, write_dataset
+
+import hashlib
+import json
+import threading
+
+# -------------
+# Per-ticker scrape checkpoints
+# -------------
+
+class ShardStore:
+    """
+    Persist each completed ticker of a scrape as its own shard and keep
+    a manifest of finished tickers, so an interrupted scrape can resume.
+
+    Layout under `shard_dir`:
+        manifest.json    -> {"signature": ..., "tickers": {ticker: {"rows": n, ...}}}
+        <ticker>.parquet -> long facts for that ticker (absent when rows == 0;
+                            <ticker>.csv with STORAGE_FORMAT = "csv")
+
+    Parameters
+    ----------
+    shard_dir : str
+        Directory holding shards and manifest.
+    signature : str
+        Identifies what is being scraped (method, taxonomy, tags). Shards
+        written under a different signature are never reused.
+    resume : bool
+        Keep shards from a previous run with the same signature. If False,
+        the directory is cleared first.
+    """
+
+    def __init__(self, shard_dir: str = DATA_SHARDS, signature: str = "", resume: bool = False):
+        self.shard_dir = shard_dir
+        self.signature = signature
+        self._lock = threading.Lock()
+        self._manifest_path = os.path.join(shard_dir, "manifest.json")
+
+        os.makedirs(shard_dir, exist_ok=True)
+        manifest = self._load_manifest()
+
+        if resume and manifest.get("signature") == signature:
+            self.tickers = manifest.get("tickers", {})
+            if self.tickers:
+                print(f"Resuming: {len(self.tickers)} tickers already scraped")
+        else:
+            if resume and manifest:
+                print("Checkpoint was written for a different scrape; starting over")
+            self.clear()
+
+    @staticmethod
+    def make_signature(*parts) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:16]
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self._manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_manifest(self) -> None:
+        tmp = self._manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"signature": self.signature, "tickers": self.tickers}, f, indent=1)
+        os.replace(tmp, self._manifest_path)
+
+    def _shard_path(self, ticker: str) -> str:
+        """Dataset base path of one ticker's shard (see storage.write_dataset)."""
+        return os.path.join(self.shard_dir, ticker.replace(os.sep, "_"))
+
+    def is_done(self, ticker: str) -> bool:
+        return ticker in self.tickers
+
+    def write(self, ticker: str, df: pd.DataFrame | None) -> None:
+        """Persist one ticker's facts, then record it in the manifest."""
+
+        rows = 0 if df is None else len(df)
+
+        # One typed file per ticker, swapped into place once complete
+        if rows:
+            write_dataset(df, self._shard_path(ticker), partition_cols=[], export_csv=False)
+
+        with self._lock:
+            self.tickers[ticker] = {"rows": rows, "completed_at": time.time()}
+            self._save_manifest()
+
+    def consolidate(self, tickers: list[str]) -> pd.DataFrame:
+        """Concatenate the shards of `tickers`, in that order."""
+
+        dfs = []
+        for ticker in tickers:
+            if self.tickers.get(ticker, {}).get("rows", 0) == 0:
+                continue
+
+            df = read_dataset(self._shard_path(ticker), keep_categories=True)
+
+            # No-ops on Parquet; CSV shards come back as strings
+            df["start"] = pd.to_datetime(df["start"], errors="coerce")
+            df["end"] = pd.to_datetime(df["end"], errors="coerce")
+            df["fy"] = pd.to_numeric(df["fy"], errors="coerce").astype("Int64")
+            dfs.append(df)
+
+        if not dfs:
+            return pd.DataFrame()
+
+        return concat_facts(dfs)
+
+    def clear(self) -> None:
+        for name in os.listdir(self.shard_dir):
+            if name.endswith((".parquet", ".csv")) or name == "manifest.json":
+                os.remove(os.path.join(self.shard_dir, name))
+
+        self.tickers = {}
+        self._save_manifest()
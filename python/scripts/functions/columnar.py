@@ -0,0 +1,166 @@
+from python.imports import *
+from python.config import *
+
+import threading
+from array import array
+from datetime import date
+
+# -------------
+# Columnar fact table
+# -------------
+
+# Column layout of the long fact table (same as financials.csv)
+FACT_DATE_COLS = ["start", "end"]
+FACT_STR_COLS = ["accn", "fp", "form", "filed", "frame", "ticker", "source_tag"]
+FACT_COLUMNS = [
+    "start", "end", "val",
+    "accn", "fy", "fp",
+    "form", "filed", "frame",
+    "ticker", "source_tag",
+]
+
+_EPOCH = date(1970, 1, 1).toordinal()
+_NAT = np.iinfo(np.int64).min      # missing date / fy sentinel (= NaT as datetime64)
+_LAST = np.iinfo(np.int64).max     # sort key for missing values (na_position="last")
+
+
+class FactTable:
+    """
+    Growing columnar table that SEC payloads are decoded into directly.
+
+    Each appended payload goes straight into typed buffers instead of a
+    per-response DataFrame:
+      - start / end : int64 day ordinals (days since 1970-01-01)
+      - val         : float64
+      - fy          : int64 with a missing-value sentinel
+      - strings     : int32 codes into one dictionary per column
+
+    to_frame() builds the pandas frame once, with datetime64 dates,
+    nullable Int64 fy and categorical strings (sorted categories).
+    Rows are ordered by (chunk, end, fy) with missing values last, i.e.
+    exactly the order concept_to_df + concat would give when chunks are
+    numbered in collection order. Appends are thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chunk = array("q")
+        self._dates = {c: array("q") for c in FACT_DATE_COLS}
+        self._val = array("d")
+        self._fy = array("q")
+        self._codes = {c: array("i") for c in FACT_STR_COLS}
+        self._dicts = {c: {} for c in FACT_STR_COLS}
+        self._days = {}
+
+    def __len__(self) -> int:
+        return len(self._val)
+
+    def _day(self, s) -> int:
+        if not s:
+            return _NAT
+
+        d = self._days.get(s)
+        if d is None:
+            try:
+                d = date.fromisoformat(s).toordinal() - _EPOCH
+            except (TypeError, ValueError):
+                d = _NAT
+            self._days[s] = d
+
+        return d
+
+    def _code(self, col: str, v) -> int:
+        if v is None:
+            return -1
+
+        d = self._dicts[col]
+        c = d.get(v)
+        if c is None:
+            c = d[v] = len(d)
+
+        return c
+
+    def append_concept(self, j: dict | None, chunk: int = 0, **constants) -> int:
+        """
+        Append the first unit of a companyconcept-shaped payload
+        (also facts[taxonomy][tag] of a companyfacts payload).
+
+        `constants` fill per-payload columns such as ticker and source_tag.
+        Returns the number of rows appended.
+        """
+
+        units = (j or {}).get("units", {})
+        if not units:
+            return 0
+
+        rows = units[next(iter(units))]
+        if not rows:
+            return 0
+
+        n = len(rows)
+
+        with self._lock:
+            self._chunk.extend([chunk] * n)
+
+            for c in FACT_DATE_COLS:
+                self._dates[c].extend([self._day(r.get(c)) for r in rows])
+
+            self._val.extend([
+                float(v) if isinstance(v, (int, float)) else np.nan
+                for v in (r.get("val") for r in rows)
+            ])
+            self._fy.extend([
+                int(v) if isinstance(v, int) else _NAT
+                for v in (r.get("fy") for r in rows)
+            ])
+
+            for c in FACT_STR_COLS:
+                if c in constants:
+                    self._codes[c].extend([self._code(c, constants[c])] * n)
+                else:
+                    self._codes[c].extend([self._code(c, r.get(c)) for r in rows])
+
+        return n
+
+    def to_frame(self) -> pd.DataFrame:
+        """Materialize the table as a long DataFrame (FACT_COLUMNS)."""
+
+        if len(self) == 0:
+            return pd.DataFrame(columns=FACT_COLUMNS)
+
+        with self._lock:
+            chunk = np.frombuffer(self._chunk, dtype=np.int64)
+            end = np.frombuffer(self._dates["end"], dtype=np.int64)
+            fy = np.frombuffer(self._fy, dtype=np.int64)
+
+            order = np.lexsort((
+                np.where(fy == _NAT, _LAST, fy),
+                np.where(end == _NAT, _LAST, end),
+                chunk,
+            ))
+
+            cols = {}
+
+            for c in FACT_DATE_COLS:
+                days = np.frombuffer(self._dates[c], dtype=np.int64)[order]
+                cols[c] = days.view("datetime64[D]").astype("datetime64[ns]")
+
+            cols["val"] = np.frombuffer(self._val, dtype=np.float64)[order]
+
+            fy = fy[order]
+            missing = fy == _NAT
+            cols["fy"] = pd.arrays.IntegerArray(np.where(missing, 0, fy), missing)
+
+            # Categories in sorted order (not arrival order, which depends
+            # on thread timing) so sorts and groupbys match plain strings
+            for c in FACT_STR_COLS:
+                codes = np.frombuffer(self._codes[c], dtype=np.int32)[order]
+                values = np.array(list(self._dicts[c]), dtype=object)
+                rank = np.empty(len(values) + 1, dtype=np.int32)
+                rank[np.argsort(values, kind="stable")] = np.arange(len(values), dtype=np.int32)
+                rank[-1] = -1
+                cols[c] = pd.Categorical.from_codes(
+                    rank[codes], categories=pd.Index(np.sort(values), dtype=object)
+                )
+
+        return pd.DataFrame(cols, columns=FACT_COLUMNS)
@@ -0,0 +1,108 @@
+from python.imports import *
+from python.config import *
+
+import json
+import threading
+
+# -------------
+# Tag-coverage index and negative cache
+# -------------
+
+class CoverageIndex:
+    """
+    Persisted record of which XBRL tags exist for which CIK, used to plan
+    only requests that can succeed.
+
+    Layout of the JSON file:
+        {"ciks": {cik10: {"complete_at": ts | null,
+                          "tags": {"<taxonomy>/<tag>": {"first", "last", "n"}}}},
+         "missing": {"<cik10>/<taxonomy>/<tag>": expiry_ts}}
+
+    - A concept response adds one tag (first / last period end, fact count).
+    - A companyfacts response lists every tag the company reports, so the
+      CIK is marked complete: for COVERAGE_TTL seconds, any tag absent
+      from it is known to be missing.
+    - A 404 goes into the negative cache until NEGATIVE_TTL expires.
+    """
+
+    def __init__(self, path: str = COVERAGE_INDEX):
+        self.path = path
+        self._lock = threading.Lock()
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+
+        self.ciks = data.get("ciks", {})
+        self.missing = data.get("missing", {})
+
+    def save(self) -> None:
+        with self._lock:
+            now = time.time()
+            self.missing = {k: v for k, v in self.missing.items() if v > now}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"ciks": self.ciks, "missing": self.missing}, f)
+            os.replace(tmp, self.path)
+
+    @staticmethod
+    def _summary(concept: dict) -> dict | None:
+        units = concept.get("units", {})
+        rows = units[next(iter(units))] if units else []
+        ends = [r["end"] for r in rows if r.get("end")]
+
+        if not ends:
+            return None
+
+        return {"first": min(ends), "last": max(ends), "n": len(rows)}
+
+    def record_concept(self, cik10: str, taxonomy: str, tag: str, j: dict) -> None:
+        summary = self._summary(j or {})
+
+        with self._lock:
+            entry = self.ciks.setdefault(cik10, {"complete_at": None, "tags": {}})
+            if summary is not None:
+                entry["tags"][f"{taxonomy}/{tag}"] = summary
+            self.missing.pop(f"{cik10}/{taxonomy}/{tag}", None)
+
+    def record_facts(self, cik10: str, j: dict) -> None:
+        tags = {}
+        for taxonomy, concepts in (j or {}).get("facts", {}).items():
+            for tag, concept in concepts.items():
+                summary = self._summary(concept)
+                if summary is not None:
+                    tags[f"{taxonomy}/{tag}"] = summary
+
+        with self._lock:
+            self.ciks[cik10] = {"complete_at": time.time(), "tags": tags}
+
+    def record_missing(self, cik10: str, taxonomy: str, tag: str, ttl: float = NEGATIVE_TTL) -> None:
+        with self._lock:
+            self.missing[f"{cik10}/{taxonomy}/{tag}"] = time.time() + ttl
+
+    def is_missing(self, cik10: str, taxonomy: str, tag: str, ttl: float = COVERAGE_TTL) -> bool:
+        """True if a request for this (cik, tag) is known to 404."""
+
+        now = time.time()
+
+        if self.missing.get(f"{cik10}/{taxonomy}/{tag}", 0) > now:
+            return True
+
+        entry = self.ciks.get(cik10)
+        if entry and entry.get("complete_at") and now - entry["complete_at"] < ttl:
+            return f"{taxonomy}/{tag}" not in entry["tags"]
+
+        return False
+
+    def coverage_frame(self) -> pd.DataFrame:
+        """Flat view: one row per (cik, taxonomy, tag) with first / last / n."""
+
+        rows = [
+            {"cik": cik10, "taxonomy": key.split("/")[0], "tag": key.split("/")[1], **s}
+            for cik10, entry in self.ciks.items()
+            for key, s in entry["tags"].items()
+        ]
+        return pd.DataFrame(rows, columns=["cik", "taxonomy", "tag", "first", "last", "n"])
@@ -0,0 +1,141 @@
+from python.imports import *
+from python.config import *
+
+# -------------
+# Rule-based deduplication
+# -------------
+# A rule is a tuple (name, key, prefer):
+#   key    : columns identifying one observation
+#   prefer : [(column, ascending), ...] order in which rows of a key compete;
+#            the first row wins. Missing values rank last in both directions
+#            (as in sort_values), remaining ties go to the earlier row.
+# Rules are applied in order, each to the rows the previous ones kept.
+
+# Economic observation (ticker, label, source_tag, start, end): the row that
+# carries the XBRL frame, else the first row in input order. This is what
+# collapse_duplicates_ignoring_frame followed by deduplicate_by_latest_filing
+# kept: the second step shares the key, so it never removed anything
+OBSERVATION_RULE = (
+    "frame_duplicates",
+    ["ticker", "label", "source_tag", "start", "end"],
+    [("frame", True)],
+)
+
+# Same period end reported over different intervals: the longest interval
+MAX_INTERVAL_RULE = (
+    "max_interval",
+    ["ticker", "label", "source_tag", "end"],
+    [("interval_days", False)],
+)
+
+# Several observations on one SCM time point: 10-Q forms, then the latest end
+COLLISION_RULE = (
+    "prefer_10q_then_latest_end",
+    ["ticker", "label", "time"],
+    [("_is_10q", False), ("end", False)],
+)
+
+
+_MAX_CODE = 2 ** 62
+
+
+def _combine(codes: np.ndarray, c: np.ndarray, n: int, sort: bool = False) -> np.ndarray:
+    """Mixed-radix combination of two code arrays, re-densified before it could overflow."""
+
+    if codes.max(initial=0) >= _MAX_CODE // max(n, 1):
+        codes, _ = pd.factorize(codes, sort=sort)
+    return codes * n + c
+
+
+def _key_codes(columns: list[pd.Series], n: int) -> np.ndarray:
+    """One int64 code per distinct combination of values (missing values included)."""
+
+    codes = np.zeros(n, dtype=np.int64)
+
+    for s in columns:
+        c, uniques = pd.factorize(s, use_na_sentinel=False)
+        codes = _combine(codes, c, len(uniques))
+
+    return codes
+
+
+def _preference_codes(columns: list[tuple[pd.Series, bool]], n: int) -> np.ndarray:
+    """
+    One int64 code per row that orders rows by preference (smaller is
+    better): each column's values are replaced by their rank among the
+    distinct values, reversed for descending, missing values last.
+    Categoricals rank by category order, as sort_values does.
+    """
+
+    codes = np.zeros(n, dtype=np.int64)
+
+    for s, ascending in columns:
+        c, uniques = pd.factorize(s, sort=True)
+        k = len(uniques)
+        if not ascending:
+            c = np.where(c >= 0, k - 1 - c, c)
+        c = np.where(c >= 0, c, k)
+        codes = _combine(codes, c, k + 1, sort=True)
+
+    return codes
+
+
+def deduplicate(
+    df: pd.DataFrame,
+    rules: list[tuple],
+    return_report: bool = False,
+) -> pd.DataFrame | tuple[pd.DataFrame, dict]:
+    """
+    Apply deduplication rules in order and return the surviving rows.
+
+    Each rule works on integer arrays only: the key columns are
+    factorized into one key code, the preference columns into one
+    preference code, and a hash-based groupby picks the row with the
+    smallest preference code per key. The frame itself is neither copied
+    nor sorted per rule; the survivors are taken once at the end, in
+    their input order.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Input dataframe.
+    rules : list of (name, key, prefer)
+        See OBSERVATION_RULE for the format. Preference columns absent
+        from `df` are skipped.
+    return_report : bool
+        Also return {rule name: rows removed}.
+
+    Returns
+    -------
+    pd.DataFrame
+        Deduplicated dataframe. With `return_report`, a (dataframe, report)
+        tuple.
+    """
+
+    keep = np.arange(len(df))
+    report = {}
+
+    for name, key, prefer in rules:
+        # Only the rule's columns are gathered for the surviving rows
+        keys = _key_codes([df[col].iloc[keep] for col in key], len(keep))
+        pref = _preference_codes(
+            [(df[col].iloc[keep], asc) for col, asc in prefer if col in df.columns], len(keep)
+        )
+
+        # idxmin returns the first row among equally preferred ones
+        winners = pd.Series(pref).groupby(keys, sort=False).idxmin().to_numpy()
+
+        winners = np.sort(keep[winners])
+        report[name] = len(keep) - len(winners)
+        keep = winners
+
+    out = df.iloc[keep]
+
+    if return_report:
+        return out, report
+
+    return out
+
+
+def format_report(report: dict) -> str:
+    return ", ".join(f"{name} {n}" for name, n in report.items())
@@ -0,0 +1,199 @@
+from python.imports import *
+from python.config import *
+
+import gzip
+import hashlib
+import json
+import tempfile
+
+# -------------
+# On-disk HTTP response cache
+# -------------
+# One entry per URL, stored as two files under CACHE_DIR:
+#   <sha256(url)>.meta.json  -> url, status, ETag, Last-Modified, fetched_at
+#   <sha256(url)>.body.gz    -> gzip-compressed response body (status 200 only)
+# 404 responses are cached as metadata only, so offline runs know a
+# concept does not exist instead of treating it as a cache miss.
+
+
+class CacheMiss(LookupError):
+    """Raised in offline mode when a URL has never been cached."""
+
+
+def set_cache_dir(path: str) -> None:
+    """Point the cache at another directory (e.g. an isolated benchmark cache)."""
+    global CACHE_DIR
+    CACHE_DIR = path
+
+
+def _entry_paths(url: str, cache_dir: str | None = None) -> tuple[str, str]:
+    cache_dir = cache_dir or CACHE_DIR
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    base = os.path.join(cache_dir, key[:2], key)
+    return base + ".meta.json", base + ".body.gz"
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def cache_get(url: str, cache_dir: str | None = None):
+    """
+    Return (meta, body) for a cached URL, or (None, None) on a miss.
+    `body` is the raw response bytes, or None for a cached 404.
+    """
+
+    meta_path, body_path = _entry_paths(url, cache_dir)
+
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None, None
+
+    if meta.get("status") != 200:
+        return meta, None
+
+    try:
+        with gzip.open(body_path, "rb") as f:
+            body = f.read()
+    except (FileNotFoundError, OSError, EOFError):
+        return None, None
+
+    # Bump mtime so size-based eviction is least-recently-used
+    os.utime(meta_path)
+
+    return meta, body
+
+
+def cache_put(
+    url: str,
+    status: int,
+    body: bytes | None = None,
+    headers=None,
+    cache_dir: str | None = None,
+) -> dict:
+    """
+    Store a response. Body is written before metadata so a reader never
+    sees metadata pointing at a half-written body.
+    """
+
+    headers = headers or {}
+    meta_path, body_path = _entry_paths(url, cache_dir)
+
+    if status == 200:
+        _atomic_write(body_path, gzip.compress(body, compresslevel=5))
+
+    meta = {
+        "url": url,
+        "status": status,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "fetched_at": time.time(),
+    }
+    _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    return meta
+
+
+def cache_touch(url: str, meta: dict, cache_dir: str | None = None) -> None:
+    """Mark an entry as freshly validated (after a 304 Not Modified)."""
+
+    meta_path, _ = _entry_paths(url, cache_dir)
+    meta = dict(meta, fetched_at=time.time())
+    _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+
+def is_fresh(meta: dict, ttl: float = CACHE_TTL) -> bool:
+    return (time.time() - meta.get("fetched_at", 0)) < ttl
+
+
+def is_cached_404(url: str, cache_dir: str | None = None) -> bool:
+    """True if the last response stored for `url` was a 404."""
+
+    meta, _ = cache_get(url, cache_dir)
+    return meta is not None and meta.get("status") == 404
+
+
+def is_cached_fresh(url: str, ttl: float = CACHE_TTL, cache_dir: str | None = None) -> bool:
+    """True if `url` would be served from cache without a request."""
+
+    meta_path, _ = _entry_paths(url, cache_dir)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return is_fresh(json.load(f), ttl)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+
+
+def revalidation_headers(meta: dict | None) -> dict:
+    """Conditional request headers for a stale cached 200 response."""
+
+    if not meta or meta.get("status") != 200:
+        return {}
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    return headers
+
+
+def evict_cache(
+    max_bytes: int = CACHE_MAX_BYTES,
+    max_age: float | None = CACHE_MAX_AGE,
+    cache_dir: str | None = None,
+) -> int:
+    """
+    Evict entries older than `max_age` seconds, then least-recently-used
+    entries until the cache fits in `max_bytes`. Returns entries removed.
+    """
+
+    cache_dir = cache_dir or CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    entries = []
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            if not name.endswith(".meta.json"):
+                continue
+
+            meta_path = os.path.join(root, name)
+            body_path = meta_path[: -len(".meta.json")] + ".body.gz"
+            size = os.path.getsize(meta_path)
+            if os.path.exists(body_path):
+                size += os.path.getsize(body_path)
+
+            entries.append((os.path.getmtime(meta_path), size, meta_path, body_path))
+
+    # Oldest access first
+    entries.sort()
+    total = sum(e[1] for e in entries)
+    now = time.time()
+    removed = 0
+
+    for mtime, size, meta_path, body_path in entries:
+        expired = max_age is not None and (now - mtime) > max_age
+        if not expired and total <= max_bytes:
+            break
+
+        for path in (meta_path, body_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+        total -= size
+        removed += 1
+
+    return removed
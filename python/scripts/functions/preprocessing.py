@@ -1,5 +1,7 @@
 from python.imports import *
 from python.config import *
+from python.scripts.functions.schema import as_category, ensure_datetime, ensure_numeric, own, set_sorted, sort_by
+from python.scripts.functions.dedup import deduplicate
 
 # -------------
 # Dominant source tag filter
@@ -12,6 +14,7 @@ def select_dominant_source_tag_with_fallback(
     source_tag_col: str = "source_tag",
     end_col: str = "end",
     min_gap: int = 2,
+    period: str = "year",
 ) -> pd.DataFrame:
     """
     Select the dominant source_tag per (ticker, label), but if the dominant
@@ -23,20 +26,33 @@ def select_dominant_source_tag_with_fallback(
     df : pd.DataFrame
         Input dataframe.
     min_gap : int
-        Minimum number of consecutive periods (years) the dominant tag must
-        be absent before fallback is used.
+        Minimum number of consecutive periods the dominant tag must be
+        absent before fallback is used. Fallback starts at the
+        `min_gap`-th missing period of a run.
+    period : {"year", "quarter"}
+        Granularity at which gaps are measured (by `end` date).
     """
 
-    df = df.copy()
-    df[end_col] = pd.to_datetime(df[end_col], errors="coerce")
+    if period not in ("year", "quarter"):
+        raise ValueError("period must be 'year' or 'quarter'")
+
+    df = ensure_datetime(own(df), end_col)
     df["year"] = df[end_col].dt.year
 
+    # Consecutive integer period index: year, or year * 4 + quarter - 1
+    if period == "year":
+        df["_period"] = df["year"]
+    else:
+        df["_period"] = df["year"] * 4 + df[end_col].dt.quarter - 1
+
+    keys = [ticker_col, label_col]
+
     # ----------------------------
     # 1. Rank source tags by usage
     # ----------------------------
     tag_counts = (
         df
-        .groupby([ticker_col, label_col, source_tag_col])
+        .groupby([ticker_col, label_col, source_tag_col], observed=True)
         .size()
         .reset_index(name="n")
         .sort_values(
@@ -48,9 +64,9 @@ def select_dominant_source_tag_with_fallback(
     # Keep top 2 tags per (ticker, label)
     top2 = (
         tag_counts
-        .groupby([ticker_col, label_col])
+        .groupby(keys, observed=True)
         .head(2)
-        .assign(rank=lambda x: x.groupby([ticker_col, label_col]).cumcount())
+        .assign(rank=lambda x: x.groupby(keys, observed=True).cumcount())
     )
 
     dominant = top2[top2["rank"] == 0]
@@ -68,38 +84,38 @@ def select_dominant_source_tag_with_fallback(
     # ----------------------------
     # 3. Identify gaps in dominance
     # ----------------------------
-    all_years = (
+    # Grid of every period between each (ticker, label)'s first and last
+    # one, sorted by (ticker, label, period), built with array arithmetic
+    span = (
         df
-        .groupby([ticker_col, label_col])["year"]
-        .apply(lambda x: pd.Series(range(x.min(), x.max() + 1)))
+        .dropna(subset=["_period"])
+        .groupby(keys, observed=True)["_period"]
+        .agg(["min", "max"])
         .reset_index()
-        .rename(columns={0: "year"})
     )
-
-    dom_years = (
-        df_dom
-        .groupby([ticker_col, label_col, "year"])
-        .size()
-        .reset_index(name="n")
+    lo = span["min"].to_numpy(dtype=np.int64)
+    n = span["max"].to_numpy(dtype=np.int64) - lo + 1
+    group_start = np.cumsum(n) - n
+
+    grid = span[keys].iloc[np.repeat(np.arange(len(span)), n)].reset_index(drop=True)
+    grid["_period"] = np.repeat(lo - group_start, n) + np.arange(n.sum())
+
+    has_dom = (
+        grid
+        .merge(df_dom[keys + ["_period"]].drop_duplicates(), on=keys + ["_period"], how="left", indicator=True)
+        ["_merge"].eq("both")
+        .to_numpy()
     )
 
-    year_grid = all_years.merge(
-        dom_years,
-        on=[ticker_col, label_col, "year"],
-        how="left"
-    ).assign(has_dom=lambda x: x["n"].notna())
-
-    # Count consecutive gaps
-    year_grid["gap_run"] = (
-        year_grid
-        .groupby([ticker_col, label_col])["has_dom"]
-        .apply(lambda s: (~s).astype(int).groupby(s.cumsum()).cumsum())
-        .reset_index(level=[0,1], drop=True)
-    )
+    # Run length of missing periods: missing count so far minus the count
+    # at the last reset (a dominant period or the start of the group)
+    missing = ~has_dom
+    n_missing = np.cumsum(missing)
+    reset = has_dom.copy()
+    reset[group_start] = True
+    gap_run = n_missing - np.maximum.accumulate(np.where(reset, n_missing - missing, 0))
 
-    gap_years = year_grid[
-        (~year_grid["has_dom"]) & (year_grid["gap_run"] >= min_gap)
-    ][[ticker_col, label_col, "year"]]
+    gap_periods = grid.loc[missing & (gap_run >= min_gap), keys + ["_period"]]
 
     # ----------------------------
     # 4. Pull fallback observations
@@ -111,8 +127,8 @@ def select_dominant_source_tag_with_fallback(
             how="inner"
         )
         df_fb = df_fb.merge(
-            gap_years,
-            on=[ticker_col, label_col, "year"],
+            gap_periods,
+            on=keys + ["_period"],
             how="inner"
         )
     else:
@@ -121,12 +137,9 @@ def select_dominant_source_tag_with_fallback(
     # ----------------------------
     # 5. Combine dominant + fallback
     # ----------------------------
-    out = (
-        pd.concat([df_dom, df_fb], ignore_index=True)
-        .sort_values([ticker_col, label_col, end_col])
-    )
+    out = pd.concat([df_dom, df_fb], ignore_index=True).drop(columns="_period")
 
-    return out
+    return sort_by(out, [ticker_col, label_col, end_col])
 
 
 # -------------
@@ -144,11 +157,10 @@ def filter_quarterly_intervals(
       - keeps observations with 60 < interval_days < 122
     """
 
-    df = df.copy()
+    df = own(df)
 
-    # Convert to datetime
-    df[start_col] = pd.to_datetime(df[start_col], errors="coerce")
-    df[end_col]   = pd.to_datetime(df[end_col], errors="coerce")
+    # Convert to datetime (no-op after ingest_facts)
+    df = ensure_datetime(df, start_col, end_col)
 
     # Compute interval length in days
     df["interval_days"] = (df[end_col] - df[start_col]).dt.days
@@ -196,18 +208,11 @@ def deduplicate_by_latest_filing(
     if group_cols is None:
         group_cols = ["ticker", "label", "source_tag", "start", "end"]
 
-    df = df.copy()
-
     # Ensure filed is datetime
-    df[filed_col] = pd.to_datetime(df[filed_col], errors="coerce")
-
-    # Sort so that most recent filing comes first
-    df = df.sort_values(by=filed_col, ascending=False)
+    df = ensure_datetime(df, filed_col)
 
-    # Drop duplicates, keeping the most recently filed row
-    df = df.drop_duplicates(subset=group_cols, keep="first")
-
-    return df
+    # Keep the most recently filed row
+    return deduplicate(df, [("latest_filing", group_cols, [(filed_col, False)])])
 
 
 # -------------
@@ -240,16 +245,8 @@ def collapse_duplicates_ignoring_frame(
     if identity_cols is None:
         identity_cols = ["ticker", "label", "source_tag", "start", "end"]
 
-    df = df.copy()
-
-    # Deterministic ordering so result is reproducible
-    if "frame" in df.columns:
-        df = df.sort_values(by="frame")
-
-    # Drop duplicates ignoring frame
-    df = df.drop_duplicates(subset=identity_cols, keep="first")
-
-    return df
+    # Prefer the row carrying a frame (skipped when there is no frame column)
+    return deduplicate(df, [("frame_duplicates", identity_cols, [("frame", True)])])
 
 # -------------
 # Keep max interval observation
@@ -283,18 +280,11 @@ def keep_max_interval_observation(
     if identity_cols is None:
         identity_cols = ["ticker", "label", "source_tag", "end"]
 
-    df = df.copy()
-
     # Ensure interval_days is numeric
-    df[interval_col] = pd.to_numeric(df[interval_col], errors="coerce")
-
-    # Sort so largest interval comes first
-    df = df.sort_values(by=interval_col, ascending=False)
+    df = ensure_numeric(df, interval_col)
 
-    # Drop duplicates keeping the largest-interval row
-    df = df.drop_duplicates(subset=identity_cols, keep="first")
-
-    return df
+    # Keep the largest-interval row
+    return deduplicate(df, [("max_interval", identity_cols, [(interval_col, False)])])
 
 # -------------
 # Define boycotted indicator
@@ -313,10 +303,10 @@ def define_boycotted(
       = 0 otherwise
     """
 
-    df = df.copy()
+    df = own(df)
 
     # Ensure end is datetime
-    df[end_col] = pd.to_datetime(df[end_col], errors="coerce")
+    df = ensure_datetime(df, end_col)
 
     boycott_start = pd.to_datetime(boycott_start)
 
@@ -354,10 +344,10 @@ def add_year_quarter(
         DataFrame with year, quarter columns added
     """
 
-    df = df.copy()
+    df = own(df)
 
     # Ensure end is datetime
-    df[end_col] = pd.to_datetime(df[end_col], errors="coerce")
+    df = ensure_datetime(df, end_col)
 
     # Extract year and quarter
     df["year"] = df[end_col].dt.year
@@ -385,7 +375,7 @@ def add_scm_time_index(
         DataFrame with SCM time index added.
     """
 
-    df = df.copy()
+    df = own(df)
 
     # Ensure year and quarter are present
     if "year" not in df.columns or "quarter" not in df.columns:
@@ -436,29 +426,20 @@ def resolve_collisions_prefer_10q_then_latest_end(
     if identity_cols is None:
         identity_cols = ["ticker", "label", "time"]
 
-    df = df.copy()
-
     # Ensure correct types
-    df[end_col] = pd.to_datetime(df[end_col], errors="coerce")
+    df = ensure_datetime(df, end_col)
 
-    # Indicator: prefer forms containing "K"
-    df["_is_10q"] = df[form_col].astype(str).str.contains("Q", case=False, na=False)
+    # Indicator: prefer forms containing "Q"
+    is_10q = df[form_col].astype(str).str.contains("Q", case=False, na=False)
 
-    # Sort by:
+    # Prefer:
     # 1) is 10-Q (True first)
     # 2) latest end date
-    df = df.sort_values(
-        by=identity_cols + ["_is_10q", end_col],
-        ascending=[True] * len(identity_cols) + [False, False]
-    )
-
-    # Drop duplicates, keeping the preferred row
-    df = df.drop_duplicates(subset=identity_cols, keep="first")
+    rule = ("prefer_10q_then_latest_end", identity_cols, [("_is_10q", False), (end_col, False)])
+    df = deduplicate(df.assign(_is_10q=is_10q), [rule])
 
     # Cleanup
-    df = df.drop(columns="_is_10q")
-
-    return df
+    return df.drop(columns="_is_10q")
 
 
 # -------------
@@ -475,7 +456,7 @@ def refine_estimation_window(
     Keep only rows within [start_time, end_time] on the SCM time index.
     If start_time or end_time is None, it is left unbounded on that side.
     """
-    out = df.copy()
+    out = own(df)
 
     if start_time is not None:
         out = out[out[time_col] >= start_time]
@@ -519,13 +500,13 @@ def drop_chronically_sparse_donors(
     - The treated unit(s) are never dropped.
     - This function assumes one row per (unit, time, label) in the long data.
     """
-    out = df.copy()
+    out = own(df)
 
     # Identify treated units (never drop)
     treated_units = set(out.loc[out[treat_col] == 1, unit_col].unique())
 
     # Work on outcome label only to compute coverage
-    sub = out[out[label_col] == outcome_label].copy()
+    sub = out[out[label_col] == outcome_label]
 
     # Define pre-treatment mask
     if pre_period_end is not None:
@@ -533,7 +514,7 @@ def drop_chronically_sparse_donors(
     else:
         pre_mask = sub[treat_col] == 0
 
-    sub_pre = sub[pre_mask].copy()
+    sub_pre = sub[pre_mask]
 
     # Total pre-treatment time points available in the sample
     pre_times = sub_pre[time_col].dropna().unique()
@@ -546,7 +527,7 @@ def drop_chronically_sparse_donors(
     obs_pre = (
         sub_pre
         .dropna(subset=[time_col])
-        .groupby(unit_col)[time_col]
+        .groupby(unit_col, observed=True)[time_col]
         .nunique()
         .rename("observed_pre_T")
         .reset_index()
@@ -558,7 +539,7 @@ def drop_chronically_sparse_donors(
         obs_pre.loc[obs_pre["pre_coverage"] >= min_pre_coverage, unit_col].unique()
     ) | treated_units
 
-    out = out[out[unit_col].isin(keep_units)].copy()
+    out = own(out[out[unit_col].isin(keep_units)])
     return out
 
 # -------------
@@ -606,7 +587,8 @@ def pivot_wide(
     # Optional: flatten column names if label column becomes a MultiIndex (rare)
     out.columns = [str(c) for c in out.columns]
 
-    return out
+    # pivot sorts its index, and the left merge keeps that order
+    return set_sorted(out, [unit_col, time_col])
 
 
 def complete_scm_time_grid(
@@ -620,37 +602,40 @@ def complete_scm_time_grid(
     Example time_col: 8034, 8035, 8036, ...
 
     Creates missing (unit, time) rows between each unit's
-    observed min and max time.
-    """
+    observed min and max time. Rows are sorted by (unit, time);
+    rows with a missing unit are dropped.
 
-    df = df.copy()
+    The full grid is built at once from per-unit min / max times and
+    the frame is reindexed onto it in one pass, so (unit, time) pairs
+    must be unique.
+    """
 
     # Enforce integer time index
     if not np.issubdtype(df[time_col].dtype, np.integer):
         raise TypeError(f"{time_col} must be integer for SCM-style time")
 
-    df = df.sort_values([unit_col, time_col])
+    df = df[df[unit_col].notna()]
 
-    completed = []
+    if df.duplicated(subset=[unit_col, time_col]).any():
+        raise ValueError(f"Cannot complete time grid: duplicate ({unit_col}, {time_col}) rows exist.")
 
-    for unit, g in df.groupby(unit_col):
-        t_min = int(g[time_col].min())
-        t_max = int(g[time_col].max())
+    # Per-unit time span (units in sorted order)
+    span = df.groupby(unit_col, observed=True)[time_col].agg(["min", "max"])
+    t_min = span["min"].to_numpy(dtype=np.int64)
+    n = span["max"].to_numpy(dtype=np.int64) - t_min + 1
+    start = np.cumsum(n) - n
 
-        full_time = pd.DataFrame({
-            unit_col: unit,
-            time_col: np.arange(t_min, t_max + 1)
-        })
-
-        g_full = full_time.merge(
-            g,
-            on=[unit_col, time_col],
-            how="left"
-        )
-
-        completed.append(g_full)
+    # unit repeated over its span; time = t_min + position within the span
+    full = pd.MultiIndex.from_arrays(
+        [
+            span.index.repeat(n),
+            (np.repeat(t_min - start, n) + np.arange(n.sum())).astype(df[time_col].dtype),
+        ],
+        names=[unit_col, time_col],
+    )
 
-    return pd.concat(completed, ignore_index=True)
+    out = df.set_index([unit_col, time_col]).reindex(full).reset_index()
+    return set_sorted(out, [unit_col, time_col])
 
 # -------------
 # Impute all numeric columns within unit
@@ -661,8 +646,10 @@ def impute_all_numeric_within_unit(
     unit_col: str,
     time_col: str,
     exclude_cols: list = None,
-    method: str = "both"
-) -> pd.DataFrame:
+    method: str = "both",
+    max_gap: int | None = None,
+    return_mask: bool = False,
+) -> pd.DataFrame | tuple[pd.DataFrame, pd.DataFrame]:
     """
     Impute ALL numeric columns within each unit using forward/backward fill.
 
@@ -678,14 +665,25 @@ def impute_all_numeric_within_unit(
         Columns to exclude from imputation (IDs, treatment, etc.).
     method : {'forward', 'backward', 'both'}
         Direction of imputation.
+    max_gap : int, optional
+        Fill at most this many consecutive missing periods from an
+        observed value (in each direction); cells further away stay
+        missing. None fills without limit.
+    return_mask : bool
+        Also return a boolean frame (numeric columns, same index) that is
+        True where a value was imputed.
 
     Returns
     -------
     pd.DataFrame
-        Imputed dataframe.
+        Imputed dataframe, sorted by (unit, time), columns in input order;
+        rows with a missing unit are dropped. With `return_mask`, a
+        (dataframe, mask) tuple.
     """
 
-    df = df.copy()
+    if method not in ("forward", "backward", "both"):
+        raise ValueError("method must be 'forward', 'backward' or 'both'")
+
     exclude_cols = exclude_cols or []
 
     # Identify numeric columns only
@@ -696,16 +694,23 @@ def impute_all_numeric_within_unit(
           .tolist()
     )
 
-    df = df.sort_values([unit_col, time_col])
+    # Filtering gives a new frame, so the fill below never writes into the input
+    df = sort_by(df[df[unit_col].notna()], [unit_col, time_col])
+
+    # Grouped fill kernels over the whole numeric block (no per-unit Python)
+    block = df[numeric_cols]
+    filled = block
+    if method in ("forward", "both"):
+        filled = filled.groupby(df[unit_col], observed=True).ffill(limit=max_gap)
+    if method in ("backward", "both"):
+        filled = filled.groupby(df[unit_col], observed=True).bfill(limit=max_gap)
 
-    def _impute(group):
-        if method in ("forward", "both"):
-            group[numeric_cols] = group[numeric_cols].ffill()
-        if method in ("backward", "both"):
-            group[numeric_cols] = group[numeric_cols].bfill()
-        return group
+    df[numeric_cols] = filled
 
-    return df.groupby(unit_col, group_keys=False).apply(_impute)
+    if return_mask:
+        return df, block.isna() & filled.notna()
+
+    return df
 
 
 def standardize_by_period0(
@@ -745,12 +750,11 @@ def standardize_by_period0(
         DataFrame with standardized columns added.
     """
 
-    df = df.copy()
-    df = df.sort_values([unit_col, time_col])
+    df = sort_by(own(df), [unit_col, time_col])
 
     # Get period-0 values per unit
     baseline = (
-        df.groupby(unit_col, as_index=False)
+        df.groupby(unit_col, as_index=False, observed=True)
           .first()[[unit_col] + cols]
           .rename(columns={c: f"{c}_p0" for c in cols})
     )
@@ -794,7 +798,7 @@ def log_transform_vars(
         X_log = log(X)
     """
 
-    df = df.copy()
+    df = own(df)
 
     for c in cols:
         df[f"{c}{suffix}"] = np.log(df[c])
@@ -810,7 +814,7 @@ def drop_missing_revenue_rows(
     """
     Drop rows with missing revenue values.
     """
-    return df[df[revenue_col].notna()].copy()
+    return own(df[df[revenue_col].notna()])
 
 
 
@@ -833,7 +837,7 @@ def enforce_common_revenue_time_support(
     # Count how many units have observed revenue at each time
     valid_counts = (
         df[df[revenue_col].notna()]
-        .groupby(time_col)[unit_col]
+        .groupby(time_col, observed=True)[unit_col]
         .nunique()
     )
 
@@ -841,7 +845,7 @@ def enforce_common_revenue_time_support(
     common_times = valid_counts[valid_counts == n_units].index
 
     # Restrict dataset
-    df_out = df[df[time_col].isin(common_times)].copy()
+    df_out = own(df[df[time_col].isin(common_times)])
 
     return df_out
 
@@ -876,13 +880,16 @@ def set_boycotted_from_time(
     """
 
     if not inplace:
-        df = df.copy()
+        df = own(df)
 
     # Normalize types (important for SCM robustness)
     df[time_col] = df[time_col].round().astype(int)
     start_time = int(start_time)
 
+    categorical = isinstance(df[ticker_col].dtype, pd.CategoricalDtype)
     df[ticker_col] = df[ticker_col].astype(str).str.strip().str.upper()
+    if categorical:
+        df[ticker_col] = as_category(df[ticker_col])
     treated_ticker = treated_ticker.strip().upper()
 
     # Default: no one is treated
@@ -913,7 +920,7 @@ def add_time_label_from_scm(
     """
 
     if not inplace:
-        df = df.copy()
+        df = own(df)
 
     # Ensure integer SCM time
     df[time_col] = df[time_col].round().astype(int)
@@ -0,0 +1,244 @@
+from python.imports import *
+from python.config import *
+
+import json
+import threading
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows: no host-wide limiter
+    fcntl = None
+
+# -------------
+# Token bucket rate limiter
+# -------------
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every request of one process.
+
+    Tokens refill continuously at `rate` per second up to `capacity`;
+    each request consumes one token and blocks until one is available.
+
+    Parameters
+    ----------
+    rate : float
+        Sustained requests per second (SEC fair access allows 10).
+    capacity : float, optional
+        Maximum burst size. Defaults to SEC_BURST.
+    """
+
+    def __init__(self, rate: float = SEC_MAX_RPS, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else SEC_BURST)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Telemetry: recent grant times and time spent queueing
+        self._stamps = deque()
+        self._acquired = 0
+        self._waited = 0.0
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until `tokens` are available and consume them.
+        Returns the number of seconds spent waiting.
+        """
+
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._last) * self.rate
+                )
+                self._last = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self._record(now, waited)
+                    return waited
+
+                delay = (tokens - self._tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+    def _record(self, now: float, waited: float, window: float = 10.0) -> None:
+        self._stamps.append(now)
+        while self._stamps and now - self._stamps[0] > window:
+            self._stamps.popleft()
+        self._acquired += 1
+        self._waited += waited
+
+    def stats(self, window: float = 10.0) -> dict:
+        """Request rate over the last `window` seconds and mean queueing delay."""
+
+        with self._lock:
+            now = time.monotonic()
+            recent = sum(1 for t in self._stamps if now - t <= window)
+            return {
+                "rate": recent / window,
+                "acquired": self._acquired,
+                "mean_wait": self._waited / self._acquired if self._acquired else 0.0,
+            }
+
+
+# -------------
+# Host-wide token bucket (shared by every process on the machine)
+# -------------
+
+class SharedTokenBucket:
+    """
+    Token bucket whose state lives in a small JSON file guarded by an
+    exclusive flock, so every scraper process on the host draws from the
+    same budget. All processes should be configured with the same rate.
+
+    The state file also keeps the grant times of the last `window`
+    seconds and a moving average of queueing delay, so any process can
+    report the host-wide request rate (see stats()).
+
+    Parameters
+    ----------
+    path : str
+        State file shared by all processes (default SEC_LIMITER_FILE).
+    rate : float
+        Host-wide requests per second.
+    capacity : float, optional
+        Maximum burst size. Defaults to SEC_BURST.
+    window : float
+        Seconds of history used for the reported request rate.
+    """
+
+    def __init__(
+        self,
+        path: str = SEC_LIMITER_FILE,
+        rate: float = SEC_MAX_RPS,
+        capacity: float | None = None,
+        window: float = 10.0,
+    ):
+        if fcntl is None:
+            raise OSError("SharedTokenBucket needs fcntl (POSIX only)")
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.path = path
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else SEC_BURST)
+        self.window = float(window)
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._waited = 0.0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _update(self, fn):
+        """Run fn(state) under the host-wide lock and persist the state."""
+
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+            with os.fdopen(fd, "r+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    raw = f.read()
+                    try:
+                        state = json.loads(raw) if raw else {}
+                    except json.JSONDecodeError:
+                        state = {}
+
+                    result = fn(state)
+
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+        return result
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until `tokens` are available host-wide and consume them.
+        Returns the number of seconds spent waiting.
+        """
+
+        waited = 0.0
+
+        while True:
+            def _take(state):
+                now = time.time()
+                last = state.get("last", now)
+                available = min(
+                    self.capacity,
+                    state.get("tokens", self.capacity) + max(0.0, now - last) * self.rate
+                )
+                state["last"] = now
+
+                if available < tokens:
+                    state["tokens"] = available
+                    return (tokens - available) / self.rate
+
+                state["tokens"] = available - tokens
+                state["stamps"] = [
+                    t for t in state.get("stamps", []) if now - t <= self.window
+                ] + [now]
+                state["wait_ewma"] = 0.9 * state.get("wait_ewma", 0.0) + 0.1 * waited
+                return 0.0
+
+            delay = self._update(_take)
+
+            if delay == 0.0:
+                self._acquired += 1
+                self._waited += waited
+                return waited
+
+            time.sleep(delay)
+            waited += delay
+
+    def stats(self) -> dict:
+        """
+        Host-wide request rate over the last `window` seconds, host-wide
+        moving-average queueing delay, and this process's mean delay.
+        """
+
+        def _read(state):
+            now = time.time()
+            recent = [t for t in state.get("stamps", []) if now - t <= self.window]
+            return len(recent), state.get("wait_ewma", 0.0)
+
+        recent, host_wait = self._update(_read)
+
+        return {
+            "rate": recent / self.window,
+            "host_wait": host_wait,
+            "acquired": self._acquired,
+            "mean_wait": self._waited / self._acquired if self._acquired else 0.0,
+        }
+
+
+def make_limiter(
+    rate: float = SEC_MAX_RPS,
+    burst: float | None = None,
+    shared: bool = SEC_SHARED_LIMIT,
+    path: str = SEC_LIMITER_FILE,
+):
+    """
+    Host-wide limiter when `shared` and supported, otherwise a
+    process-local TokenBucket.
+    """
+
+    if shared and fcntl is not None:
+        return SharedTokenBucket(path, rate, burst)
+
+    if shared:
+        print("Host-wide rate limiting needs fcntl; using a per-process limiter")
+
+    return TokenBucket(rate, burst)
@@ -0,0 +1,248 @@
+from python.imports import *
+from python.config import *
+
+from contextlib import contextmanager
+
+# -------------
+# Compact in-memory schema of the long fact frame
+# -------------
+# Repeated strings (ticker, label, tag, form, ...) are held as categoricals,
+# i.e. int8/int16/int32 codes plus one lookup table per column, dates as
+# datetime64 and fy as a 2-byte nullable integer. Categories are kept in
+# sorted order, so sort_values and groupby give the same order as on plain
+# strings.
+
+FACT_CATEGORY_COLS = ["ticker", "label", "source_tag", "form", "fp", "accn", "frame"]
+FACT_DATE_COLS = ["start", "end", "filed"]
+FACT_NARROW_DTYPES = {"fy": "Int16", "val": "float64"}
+
+
+def as_category(s: pd.Series) -> pd.Series:
+    """Categorical with sorted categories (unused categories dropped)."""
+
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        cats = s.cat.remove_unused_categories().cat.categories
+        if cats.is_monotonic_increasing and len(cats) == len(s.cat.categories):
+            return s
+        return s.cat.set_categories(cats.sort_values())
+
+    return s.astype(pd.CategoricalDtype(pd.Index(s.dropna().unique()).sort_values()))
+
+
+def compact_facts(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a long fact frame to the compact schema. Columns already in
+    it are left as they are, so calling this again is cheap. Missing
+    columns are skipped.
+    """
+
+    out = {}
+
+    for col in df.columns:
+        s = df[col]
+
+        if col in FACT_CATEGORY_COLS:
+            s = as_category(s)
+        elif col in FACT_DATE_COLS:
+            if not pd.api.types.is_datetime64_dtype(s.dtype):
+                s = pd.to_datetime(s.astype(object), errors="coerce")
+        elif col in FACT_NARROW_DTYPES:
+            if s.dtype != FACT_NARROW_DTYPES[col]:
+                s = pd.to_numeric(s.astype(object), errors="coerce").astype(FACT_NARROW_DTYPES[col])
+
+        out[col] = s
+
+    return pd.DataFrame(out, index=df.index, columns=df.columns)
+
+
+# -------------
+# Validated ingest
+# -------------
+
+SCHEMA_ATTR = "fact_schema"                 # df.attrs key: {column: dtype name}
+FACT_REQUIRED_COLS = ["ticker", "source_tag", "end", "val"]
+
+
+def _dtypes(df: pd.DataFrame) -> dict:
+    return {col: str(dtype) for col, dtype in df.dtypes.items()}
+
+
+def ingest_facts(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Establish the column types of a long fact frame once, before any
+    preprocessing: compact_facts, a check for the columns every step
+    needs, a report of values that could not be parsed, and the
+    resulting schema recorded in df.attrs[SCHEMA_ATTR].
+
+    A frame whose recorded schema still matches its dtypes is returned
+    as is, so ingesting twice costs nothing.
+    """
+
+    if df.attrs.get(SCHEMA_ATTR) == _dtypes(df):
+        return df
+
+    missing = [c for c in FACT_REQUIRED_COLS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Fact frame is missing required columns: {missing}")
+
+    out = compact_facts(df)
+
+    for col in FACT_DATE_COLS + list(FACT_NARROW_DTYPES):
+        if col in df.columns:
+            bad = int(out[col].isna().sum() - df[col].isna().sum())
+            if bad:
+                print(f"{bad} unparseable values in '{col}' set to missing")
+
+    out.attrs[SCHEMA_ATTR] = _dtypes(out)
+    return out
+
+
+def ensure_datetime(df: pd.DataFrame, *cols: str) -> pd.DataFrame:
+    """
+    Make `cols` datetime64. Columns that already are (e.g. after
+    ingest_facts) are left untouched, so the check is a dtype lookup.
+    Returns df itself when nothing needs parsing, otherwise a new frame
+    with the parsed columns (`df` is not modified).
+    """
+
+    parsed = {
+        col: pd.to_datetime(df[col], errors="coerce")
+        for col in cols
+        if not pd.api.types.is_datetime64_dtype(df[col].dtype)
+    }
+
+    return df.assign(**parsed) if parsed else df
+
+
+def ensure_numeric(df: pd.DataFrame, *cols: str) -> pd.DataFrame:
+    """Same as ensure_datetime, for numeric columns."""
+
+    parsed = {
+        col: pd.to_numeric(df[col], errors="coerce")
+        for col in cols
+        if not pd.api.types.is_numeric_dtype(df[col].dtype)
+    }
+
+    return df.assign(**parsed) if parsed else df
+
+
+def concat_facts(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    pd.concat that keeps categoricals: categories are unioned first, since
+    concatenating categoricals with different categories gives object.
+    """
+
+    frames = [f for f in frames if not f.empty] or frames[:1]
+    if not frames:
+        return pd.DataFrame()
+
+    for col in frames[0].columns:
+        if not all(col in f and isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            continue
+
+        cats = pd.Index(
+            np.unique(np.concatenate([f[col].cat.categories.to_numpy(dtype=object) for f in frames]))
+        )
+        frames = [f.assign(**{col: f[col].cat.set_categories(cats)}) for f in frames]
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    """Resident size of `df` (strings included), in MB."""
+
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+# -------------
+# Frame ownership (copy-free mode) and sort-order tracking
+# -------------
+# By default every preprocessing step copies its input, so callers' frames
+# are never modified. Inside owned_frames() the steps may instead work on
+# their input in place: the pipeline owns its intermediate frames and drops
+# each one as soon as the next step has run, so a copy per step only adds
+# to peak memory. The switch is process-wide (streaming preprocesses on a
+# worker thread).
+
+_COPY_FREE = False
+
+
+@contextmanager
+def owned_frames(enabled: bool = True):
+    """Let preprocessing steps modify their input frames in place."""
+
+    global _COPY_FREE
+    previous, _COPY_FREE = _COPY_FREE, enabled
+    try:
+        yield
+    finally:
+        _COPY_FREE = previous
+
+
+def own(df: pd.DataFrame) -> pd.DataFrame:
+    """The frame a step may modify: `df` itself in copy-free mode, else a copy."""
+
+    return df if _COPY_FREE else df.copy()
+
+
+SORT_ATTR = "sort_order"    # df.attrs key: columns the rows are sorted by (ascending)
+
+
+def set_sorted(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
+    """Record that `df` is sorted by `cols`. Returns df."""
+
+    df.attrs[SORT_ATTR] = list(cols)
+    return df
+
+
+def _sort_key(s: pd.Series) -> np.ndarray:
+    """Values as a comparable array, missing values last (as in sort_values)."""
+
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = s.cat.codes.to_numpy().astype(np.int64)
+        return np.where(codes >= 0, codes, np.iinfo(np.int64).max)
+
+    if pd.api.types.is_datetime64_dtype(s.dtype):
+        values = s.to_numpy().view(np.int64)
+        return np.where(s.isna().to_numpy(), np.iinfo(np.int64).max, values)
+
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        return s.to_numpy(dtype=np.float64, na_value=np.inf)
+
+    # Strings: compare their sorted positions
+    codes, _ = pd.factorize(s, sort=True)
+    return np.where(codes >= 0, codes, np.iinfo(np.int64).max)
+
+
+def _is_sorted(df: pd.DataFrame, cols: list[str]) -> bool:
+    """One vectorized pass over adjacent rows; no sort and no copy of the frame."""
+
+    undecided = np.ones(max(len(df) - 1, 0), dtype=bool)
+
+    for col in cols:
+        key = _sort_key(df[col])
+        before, after = key[:-1], key[1:]
+
+        if (undecided & (before > after)).any():
+            return False
+        undecided &= before == after
+
+    return True
+
+
+def sort_by(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
+    """
+    df.sort_values(cols), skipped when df.attrs records that the rows are
+    already in that order (or a finer one starting with `cols`). The
+    record is only a hint, since pandas carries attrs through operations
+    that may reorder rows, so it is confirmed with _is_sorted before the
+    sort is skipped.
+    """
+
+    recorded = df.attrs.get(SORT_ATTR) or []
+    cols = list(cols)
+
+    if recorded[:len(cols)] == cols and all(c in df.columns for c in cols) and _is_sorted(df, cols):
+        return df
+
+    return set_sorted(df.sort_values(cols), cols)
@@ -1,34 +1,200 @@
 from python.imports import *
 from python.config import *
+from python.scripts.functions.ratelimit import make_limiter
+from python.scripts.functions.http_cache import *
+from python.scripts.functions.checkpoint import ShardStore
+from python.scripts.functions.columnar import FactTable, FACT_COLUMNS
+from python.scripts.functions.coverage import CoverageIndex
+from python.scripts.functions.telemetry import get_metrics
+from python.scripts.functions.transport import *
+
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------- RATE LIMIT ----------
+# Every SEC request goes through one token bucket, shared host-wide
+# across processes when SEC_SHARED_LIMIT is set
+_LIMITER = make_limiter(SEC_MAX_RPS)
+
+def set_rate_limit(
+    rate: float = SEC_MAX_RPS,
+    burst: float | None = None,
+    shared: bool = SEC_SHARED_LIMIT,
+) -> None:
+    global _LIMITER
+    _LIMITER = make_limiter(rate, burst, shared)
+
+# Current request rate and queueing delay of the active limiter
+def limiter_stats() -> dict:
+    return _LIMITER.stats()
+
+# ---------- TRANSPORT ----------
+# One pooled keep-alive session and one circuit breaker for every request
+_SESSION = make_session(SCRAPE_WORKERS)
+_BREAKER = CircuitBreaker()
+
+def set_circuit_breaker(**kwargs) -> None:
+    global _BREAKER
+    _BREAKER = CircuitBreaker(**kwargs)
+
+def set_pool_size(pool_size: int) -> None:
+    global _SESSION
+    _SESSION.close()
+    _SESSION = make_session(pool_size)
+
+# ---------- ENDPOINTS ----------
+# Point every endpoint at another host (e.g. the local stand-in server)
+def set_sec_host(host: str) -> None:
+    global BASE, SUBMISSIONS_BASE, TICKERS_URL, TICKERS_EXCHANGE_URL
+    host = host.rstrip("/")
+    BASE = f"{host}/api"
+    SUBMISSIONS_BASE = f"{host}/submissions"
+    TICKERS_URL = f"{host}/files/company_tickers.json"
+    TICKERS_EXCHANGE_URL = f"{host}/files/company_tickers_exchange.json"
+
+# ---------- OFFLINE MODE ----------
+# Offline: every request is served from the on-disk cache or fails
+def set_offline(offline: bool = True) -> None:
+    global SEC_OFFLINE
+    SEC_OFFLINE = offline
 
 # ---------- UTIL / FETCH ----------
 # Load SEC ticker to CIK mapping
 def load_ticker_map() -> Dict[str, str]:
-    url = "https://www.sec.gov/files/company_tickers.json"
-    r = requests.get(url, headers=UA, timeout=30)
-    r.raise_for_status()
-    j = r.json()
+    j = _get_json(TICKERS_URL)
+    if j is None:
+        raise RuntimeError(f"Could not load ticker map from {TICKERS_URL}")
     return {v["ticker"].upper(): f'{int(v["cik_str"]):010d}' for v in j.values()}
 
+# Load every SEC-listed ticker with its CIK, company name and exchange
+def load_exchange_listing() -> pd.DataFrame:
+    j = _get_json(TICKERS_EXCHANGE_URL)
+    if j is None:
+        raise RuntimeError(f"Could not load exchange listing from {TICKERS_EXCHANGE_URL}")
+
+    df = pd.DataFrame(j["data"], columns=j["fields"])
+    df["cik"] = df["cik"].map(lambda c: f"{int(c):010d}")
+    df["ticker"] = df["ticker"].str.upper()
+    return df[["cik", "ticker", "name", "exchange"]]
+
+# Run fn over jobs on a thread pool (or serially), preserving job order
+def _run_jobs(fn, jobs, max_workers: int = SCRAPE_WORKERS) -> list:
+    if max_workers > 1 and len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(fn, jobs))
+
+    return [fn(job) for job in jobs]
+
+# Map tickers to zero-padded CIKs, dropping (and reporting) unknown tickers
+def _resolve_tickers(tickers: list[str]) -> list[tuple[str, str]]:
+    ticker_map = load_ticker_map()
+    out = []
+
+    for ticker in tickers:
+        ticker = ticker.upper()
+
+        if ticker not in ticker_map:
+            print(f"Ticker not found: {ticker}")
+            continue
+
+        out.append((ticker, ticker_map[ticker]))
+
+    return out
+
+# Empty collector output keeps the long-frame columns
+def _or_empty(df: pd.DataFrame) -> pd.DataFrame:
+    return df if not df.empty else pd.DataFrame(columns=LONG_COLUMNS)
+
 # ---------- FETCHING / PARSING ----------
-def _get_json(url: str, timeout=30, max_retries=5):
-    for attempt in range(max_retries):
-        try:
-            r = requests.get(url, headers=UA, timeout=timeout)
-            if r.status_code == 404:
-                return None
-            r.raise_for_status()
-            return r.json()
+# Columns of the long (ticker × tag × fact) frame written to financials.csv
+LONG_COLUMNS = FACT_COLUMNS
+
+def _get_json(url: str, timeout=None, max_retries: int = SEC_MAX_RETRIES, ttl: float = CACHE_TTL):
+    timeout = timeout or SEC_TIMEOUT
+    meta, body = cache_get(url)
+
+    metrics = get_metrics()
 
-        except requests.exceptions.ReadTimeout:
-            time.sleep(2 ** attempt)
+    # Fresh cache entry (or any entry when offline): no request at all
+    if meta is not None and (SEC_OFFLINE or is_fresh(meta, ttl)):
+        metrics.record_cache(url, "hit")
+        return json.loads(body) if body is not None else None
 
-    return None
+    if SEC_OFFLINE:
+        raise CacheMiss(f"Offline mode: {url} is not cached")
+
+    reason = None  # last failure, for the error below (none with max_retries=0)
+
+    for attempt in range(max_retries):
+        metrics.record_sleep(_BREAKER.wait(), "circuit_breaker")
+        metrics.record_sleep(_LIMITER.acquire(), "rate_limit")
+        t0 = time.perf_counter()
+        try:
+            headers = {**UA, **revalidation_headers(meta)}
+            r = _SESSION.get(url, headers=headers, timeout=timeout)
+
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            reason = "timeout" if isinstance(e, requests.exceptions.Timeout) else "connection"
+            metrics.record_request(url, time.perf_counter() - t0, reason)
+            delay = backoff_delay(attempt)
+
+        else:
+            metrics.record_request(url, time.perf_counter() - t0, r.status_code, len(r.content))
+
+            if r.status_code not in SEC_RETRY_STATUSES:
+                _BREAKER.record_success()
+                if r.status_code == 304:
+                    metrics.record_cache(url, "revalidated")
+                    cache_touch(url, meta)
+                    return json.loads(body)
+                if r.status_code == 404:
+                    cache_put(url, 404)
+                    return None
+                r.raise_for_status()
+                cache_put(url, 200, r.content, r.headers)
+                return r.json()
+
+            reason = str(r.status_code)
+            retry_after = parse_retry_after(r.headers.get("Retry-After"))
+            if r.status_code in (429, 503):
+                _BREAKER.record_throttle(retry_after)
+            delay = backoff_delay(attempt, retry_after)
+
+        metrics.record_retry(url, reason)
+        if attempt + 1 < max_retries:
+            metrics.record_sleep(delay, "backoff")
+            time.sleep(delay)
+
+    # Never return None here: that would read as "concept does not exist"
+    raise SecRequestError(f"{url}: giving up after {max_retries} attempts (last: {reason})")
+
+# Endpoint URLs
+def concept_url(cik10: str, taxonomy: str, tag: str) -> str:
+    return f"{BASE}/xbrl/companyconcept/CIK{cik10}/{taxonomy}/{tag}.json"
+
+def facts_url(cik10: str) -> str:
+    return f"{BASE}/xbrl/companyfacts/CIK{cik10}.json"
+
+def frame_url(taxonomy: str, tag: str, unit: str, period: str) -> str:
+    return f"{BASE}/xbrl/frames/{taxonomy}/{tag}/{unit}/{period}.json"
 
 # Returns all reported values for a single XBRL tag
 def company_concept(cik10: str, taxonomy: str, tag: str):
-    url = f"{BASE}/xbrl/companyconcept/CIK{cik10}/{taxonomy}/{tag}.json"
-    return _get_json(url)
+    return _get_json(concept_url(cik10, taxonomy, tag))
+
+# Returns every reported fact for one company (all taxonomies, all tags)
+def company_facts(cik10: str):
+    return _get_json(facts_url(cik10))
+
+# Returns one period of one concept for every filer
+def company_frame(taxonomy: str, tag: str, unit: str, period: str):
+    return _get_json(frame_url(taxonomy, tag, unit, period))
+
+# Returns a company's filing history (by default always revalidated, never served stale)
+def company_submissions(cik10: str, ttl: float = 0):
+    url = f"{SUBMISSIONS_BASE}/CIK{cik10}.json"
+    return _get_json(url, ttl=ttl)
 
 # Converts SEC concept JSON to DataFrame
 def concept_to_df(j: dict) -> pd.DataFrame:
@@ -79,8 +245,6 @@ def fetch_all_tags(
             print(f"[{tag}] Tag not found: {tag}")
             continue
 
-        time.sleep(0.3)  # Be polite to SEC servers
-
         df = concept_to_df(j)
         if df.empty:
             print(f"[{tag}] Tag empty: {tag}")
@@ -106,53 +270,510 @@ def fetch_all_tags(
 def collect_concepts_long(
     tickers: list[str],
     tags: list[str],
-    taxonomy: str = "us-gaap"
+    taxonomy: str = "us-gaap",
+    max_workers: int = SCRAPE_WORKERS,
+    store: ShardStore | None = None,
+    coverage: CoverageIndex | None = None,
+    on_ticker=None,
 ) -> pd.DataFrame:
     """
-    Apply concept_to_df to every (ticker × tag) pair
+    Fetch every (ticker × tag) concept
     and return one long DataFrame with provenance.
-    """
 
-    ticker_map = load_ticker_map()
-    dfs = []
+    Requests run on `max_workers` threads and are paced by the shared
+    token bucket (see set_rate_limit). Payloads are decoded straight
+    into a columnar FactTable; row order is the same as a serial walk
+    over tickers and tags.
 
-    for ticker in tickers:
-        ticker = ticker.upper()
+    With a ShardStore, each ticker is persisted as soon as all its tags
+    are fetched, tickers already in the store are skipped, and the result
+    is consolidated from the shards.
 
-        if ticker not in ticker_map:
-            print(f"Ticker not found: {ticker}")
+    With a CoverageIndex, (ticker, tag) pairs known to 404 are not
+    requested, and every response updates the index.
+
+    With `on_ticker`, each ticker's facts are handed to
+    on_ticker(ticker, df) as soon as they are complete (df may be
+    empty) instead of being accumulated; the return value is then an
+    empty frame (or the consolidated shards, with a ShardStore).
+    """
+
+    companies = _resolve_tickers(tickers)
+    table = FactTable()
+
+    for i, (ticker, cik10) in enumerate(companies):
+        if store is not None and store.is_done(ticker):
             continue
 
-        cik10 = ticker_map[ticker]
+        if store is not None or on_ticker is not None:
+            table = FactTable()
 
-        for tag in tags:
+        def _fetch(job):
+            k, tag = job
             j = company_concept(cik10, taxonomy, tag)
-            
-            time.sleep(0.3)
-            
-            if j is None:
-                continue
 
-            df = concept_to_df(j)
+            t0 = time.perf_counter()
+            table.append_concept(j, chunk=i * len(tags) + k, ticker=ticker, source_tag=tag)
+            get_metrics().record_parse(time.perf_counter() - t0)
 
-            if df.empty:
+            if coverage is None:
+                return
+            if j is not None:
+                coverage.record_concept(cik10, taxonomy, tag, j)
+            elif is_cached_404(concept_url(cik10, taxonomy, tag)):
+                coverage.record_missing(cik10, taxonomy, tag)
+
+        jobs = [
+            (k, tag) for k, tag in enumerate(tags)
+            if coverage is None or not coverage.is_missing(cik10, taxonomy, tag)
+        ]
+        with get_metrics().timed_ticker(ticker):
+            _run_jobs(_fetch, jobs, max_workers)
+
+        if store is not None:
+            store.write(ticker, table.to_frame() if len(table) else None)
+
+        if on_ticker is not None:
+            on_ticker(ticker, _or_empty(table.to_frame()))
+
+        if coverage is not None:
+            coverage.save()
+
+    if store is not None:
+        return _or_empty(store.consolidate([ticker for ticker, _ in companies]))
+
+    return _or_empty(table.to_frame())
+
+
+# Decode every tag of a companyfacts payload into a FactTable
+def _append_facts(
+    table: FactTable,
+    j: dict | None,
+    tags: list[str],
+    taxonomy: str,
+    ticker: str,
+    chunk: int = 0,
+) -> int:
+    concepts = (j or {}).get("facts", {}).get(taxonomy, {})
+    n = 0
+
+    for k, tag in enumerate(tags):
+        if tag in concepts:
+            n += table.append_concept(
+                concepts[tag],
+                chunk=chunk * len(tags) + k,
+                ticker=ticker,
+                source_tag=tag,
+            )
+
+    return n
+
+
+def collect_facts_long(
+    tickers: list[str],
+    tags: list[str],
+    taxonomy: str = "us-gaap",
+    max_workers: int = SCRAPE_WORKERS,
+    store: ShardStore | None = None,
+    coverage: CoverageIndex | None = None,
+    on_ticker=None,
+) -> pd.DataFrame:
+    """
+    Same output as collect_concepts_long, built from the companyfacts
+    endpoint: one request per company instead of one per (ticker × tag).
+    All tags are extracted locally from each company's full fact set.
+    Checkpointing with a ShardStore works as in collect_concepts_long.
+    Each payload lists every tag the company reports, so it also records
+    the company's complete tag coverage in `coverage`. `on_ticker` works
+    as in collect_concepts_long but is called from the worker threads.
+    """
+
+    companies = _resolve_tickers(tickers)
+    table = FactTable()
+
+    def _fetch(job):
+        i, (ticker, cik10) = job
+        t = FactTable() if store is not None or on_ticker is not None else table
+
+        with get_metrics().timed_ticker(ticker):
+            j = company_facts(cik10)
+
+            t0 = time.perf_counter()
+            n = _append_facts(t, j, tags, taxonomy, ticker, chunk=i)
+            get_metrics().record_parse(time.perf_counter() - t0)
+
+        if coverage is not None and j is not None:
+            coverage.record_facts(cik10, j)
+
+        if n == 0:
+            print(f"[{ticker}] No facts found")
+        else:
+            print(f"[{ticker}] Collected {n} rows")
+
+        if store is not None:
+            store.write(ticker, t.to_frame() if n else None)
+
+        if on_ticker is not None:
+            on_ticker(ticker, _or_empty(t.to_frame()))
+
+    pending = [
+        (i, company) for i, company in enumerate(companies)
+        if store is None or not store.is_done(company[0])
+    ]
+    _run_jobs(_fetch, pending, max_workers)
+
+    if coverage is not None:
+        coverage.save()
+
+    if store is not None:
+        return _or_empty(store.consolidate([ticker for ticker, _ in companies]))
+
+    return _or_empty(table.to_frame())
+
+
+# ---------- REQUEST PLANNING ----------
+def plan_requests(
+    method: str,
+    tickers: list[str] | None,
+    tags: list[str],
+    taxonomy: str = "us-gaap",
+    coverage: CoverageIndex | None = None,
+) -> dict:
+    """
+    Dry-run estimate of a scrape: how many SEC requests it will send,
+    how many are avoided (fresh in the HTTP cache, or known to 404 per
+    the coverage index), and the time that takes at SEC_MAX_RPS.
+    """
+
+    urls, skipped = [], 0
+
+    if method in ("concept", "facts"):
+        for ticker, cik10 in _resolve_tickers(tickers):
+            if method == "facts":
+                urls.append(facts_url(cik10))
                 continue
 
-            df["ticker"] = ticker
-            df["source_tag"] = tag
+            for tag in tags:
+                if coverage is not None and coverage.is_missing(cik10, taxonomy, tag):
+                    skipped += 1
+                else:
+                    urls.append(concept_url(cik10, taxonomy, tag))
 
-            dfs.append(df)
+    elif method == "frames":
+        tag_to_label = {t: label for label, group in TAG_GROUPS.items() for t in group}
+        for tag in tags:
+            label = tag_to_label.get(tag)
+            suffix = "I" if label in INSTANT_GROUPS else ""
+            for period in frame_periods():
+                urls.append(frame_url(taxonomy, tag, FRAME_UNITS.get(label, "USD"), period + suffix))
+
+    cached = sum(is_cached_fresh(url) for url in urls)
+    n_requests = len(urls) - cached
+
+    return {
+        "requests": n_requests,
+        "cached": cached,
+        "known_missing": skipped,
+        "seconds": n_requests / SEC_MAX_RPS,
+    }
+
+
+# ---------- BULK ARCHIVE ----------
+# Stream members of SEC's companyfacts.zip without extracting to disk
+def iter_companyfacts_zip(
+    zip_path: str = COMPANYFACTS_ZIP,
+    ciks: list[str] | None = None,
+):
+    """
+    Yield (cik10, payload) for each company in the bulk archive.
 
-    if not dfs:
-        return pd.DataFrame(
-            columns=[
-                "ticker",
-                "start", "end", "val",
-                "accn", "fy", "fp",
-                "form", "filed",
-                "source_tag",
+    Members are named CIK##########.json and hold the same payload as
+    the companyfacts endpoint. With `ciks`, members are looked up
+    directly in the zip's central directory; otherwise every member
+    is read in archive order.
+    """
+
+    with zipfile.ZipFile(zip_path) as zf:
+        if ciks is None:
+            names = [
+                info.filename
+                for info in zf.infolist()
+                if os.path.basename(info.filename).startswith("CIK")
+                and info.filename.endswith(".json")
             ]
-        )
+        else:
+            members = {os.path.basename(n): n for n in zf.namelist()}
+            names = []
+            for cik10 in ciks:
+                name = members.get(f"CIK{cik10}.json")
+                if name is None:
+                    print(f"CIK not in archive: {cik10}")
+                    continue
+                names.append(name)
+
+        for name in names:
+            cik10 = os.path.basename(name)[3:-len(".json")]
+            with zf.open(name) as f:
+                yield cik10, json.load(f)
+
+
+def collect_bulk_long(
+    tickers: list[str] | None,
+    tags: list[str],
+    taxonomy: str = "us-gaap",
+    zip_path: str = COMPANYFACTS_ZIP,
+) -> pd.DataFrame:
+    """
+    Same output as collect_facts_long, read from a local companyfacts.zip
+    instead of the network.
 
-    return pd.concat(dfs, ignore_index=True)
+    tickers=None parses every filer in the archive; filers without a
+    ticker in the SEC ticker map are labelled by their 10-digit CIK.
+    """
+
+    if tickers is None:
+        cik_to_ticker = {}
+        try:
+            for ticker, cik10 in load_ticker_map().items():
+                cik_to_ticker.setdefault(cik10, ticker)
+        except CacheMiss:
+            print("Ticker map not cached; labelling filers by CIK")
+        ciks = None
+    else:
+        companies = _resolve_tickers(tickers)
+        cik_to_ticker = {cik10: ticker for ticker, cik10 in companies}
+        ciks = [cik10 for _, cik10 in companies]
+
+    table = FactTable()
+    n_companies = 0
+
+    for i, (cik10, j) in enumerate(iter_companyfacts_zip(zip_path, ciks)):
+        ticker = cik_to_ticker.get(cik10, cik10)
+        n_companies += _append_facts(table, j, tags, taxonomy, ticker, chunk=i) > 0
+
+    print(f"Parsed {n_companies} companies from {zip_path}")
+
+    return _or_empty(table.to_frame())
+
+
+# ---------- INCREMENTAL ----------
+# Identity of one reported fact in the raw store: the economic observation
+# used by deduplicate_by_latest_filing plus the accession it was filed in
+RAW_FACT_KEY = ["ticker", "source_tag", "start", "end", "accn"]
+
+def compute_watermark(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Latest filing date (and its accession) per (ticker, source_tag)
+    present in the raw store.
+    """
+
+    if df.empty:
+        return pd.DataFrame(columns=["ticker", "source_tag", "filed", "accn"])
+
+    # Plain strings: categorical filed / accn would sort by code, not value
+    return (
+        df[["ticker", "source_tag", "filed", "accn"]]
+        .astype(object)
+        .sort_values(["ticker", "source_tag", "filed", "accn"])
+        .drop_duplicates(subset=["ticker", "source_tag"], keep="last")
+        .reset_index(drop=True)
+    )
+
+
+def latest_xbrl_filing(j: dict | None) -> str | None:
+    """Most recent filingDate among a submissions payload's XBRL filings."""
+
+    if not j:
+        return None
+
+    recent = j.get("filings", {}).get("recent", {})
+    dates = recent.get("filingDate", [])
+    is_xbrl = recent.get("isXBRL", [1] * len(dates))
+
+    dates = [d for d, x in zip(dates, is_xbrl) if x]
+    return max(dates) if dates else None
+
+
+def stale_tickers(
+    tickers: list[str],
+    watermark: pd.DataFrame,
+) -> list[str]:
+    """
+    Tickers whose latest XBRL filing on EDGAR is newer than the latest
+    `filed` date recorded in the watermark (or that have no watermark).
+    Costs one submissions request per ticker.
+    """
+
+    # Compare dates, not strings; a missing `filed` (e.g. after a frames
+    # scrape) parses to NaT and counts as never filed
+    filed = pd.to_datetime(watermark["filed"].astype(object), errors="coerce")
+    last_filed = filed.groupby(watermark["ticker"].astype(object)).max().to_dict()
+    stale = []
+
+    for ticker, cik10 in _resolve_tickers(tickers):
+        latest = latest_xbrl_filing(company_submissions(cik10))
+        last = last_filed.get(ticker, pd.NaT)
+
+        if pd.isna(last) or (latest is not None and pd.Timestamp(latest) > last):
+            since = "never" if pd.isna(last) else last.date()
+            print(f"[{ticker}] New filings since {since} (latest {latest})")
+            stale.append(ticker)
+
+    return stale
+
+
+def merge_raw_facts(
+    old: pd.DataFrame,
+    new: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Merge freshly fetched facts into the existing raw store.
+
+    Keeps one row per (ticker, source_tag, start, end, accn); when a fact
+    appears in both, the freshly fetched row wins. Every filing of an
+    observation is retained, so the later collapse / latest-filing dedup
+    in preprocess() sees exactly what a full rescrape would give it.
+    """
+
+    old = old.copy()
+    for c in ("start", "end"):
+        old[c] = pd.to_datetime(old[c], errors="coerce")
+    if "fy" in old.columns:
+        old["fy"] = pd.to_numeric(old["fy"], errors="coerce").astype("Int64")
+
+    merged = pd.concat([old, new], ignore_index=True)
+    merged = merged.drop_duplicates(subset=RAW_FACT_KEY, keep="last")
+
+    return merged.reset_index(drop=True)
+
+
+# ---------- FRAMES (CROSS-SECTION) ----------
+def frame_periods(
+    start_year: int = FRAMES_START_YEAR,
+    end: str | pd.Timestamp | None = None,
+) -> list[str]:
+    """
+    Calendar-quarter frame labels (CY2009Q1, CY2009Q2, ...) from
+    `start_year` up to the last quarter completed before `end` (today).
+    """
+
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.today()
+    last = end.to_period("Q") - 1
+
+    return [
+        f"CY{p.year}Q{p.quarter}"
+        for p in pd.period_range(f"{start_year}Q1", last, freq="Q")
+    ]
+
+
+def frame_to_df(j: dict | None, cik_to_ticker: dict | None = None) -> pd.DataFrame:
+    """
+    Convert a frames payload to the long fact layout.
+
+    Frames carry no filing metadata, so fy / fp / form / filed are left
+    missing and `frame` holds the calendar period. With `cik_to_ticker`,
+    only those filers are kept; otherwise filers without a mapping are
+    labelled by their 10-digit CIK.
+    """
+
+    cols = ["start", "end", "val", "accn", "fy", "fp", "form", "filed", "frame", "ticker"]
+
+    rows = (j or {}).get("data", [])
+    if not rows:
+        return pd.DataFrame(columns=cols)
+
+    df = pd.DataFrame(rows)
+    df["cik"] = df["cik"].map(lambda c: f"{int(c):010d}")
+
+    if cik_to_ticker is not None:
+        df = df[df["cik"].isin(cik_to_ticker)].copy()
+        df["ticker"] = df["cik"].map(cik_to_ticker)
+    else:
+        df["ticker"] = df["cik"]
+
+    if "start" not in df.columns:
+        df["start"] = pd.NA
+
+    df["start"] = pd.to_datetime(df["start"], errors="coerce")
+    df["end"] = pd.to_datetime(df["end"], errors="coerce")
+    df["val"] = pd.to_numeric(df["val"], errors="coerce")
+    df["fy"] = pd.Series(pd.NA, index=df.index, dtype="Int64")
+    for c in ("fp", "form", "filed"):
+        df[c] = pd.NA
+    df["frame"] = j.get("ccp")
+
+    return df[cols]
+
+
+def collect_frames_long(
+    tickers: list[str] | None,
+    tags: list[str],
+    taxonomy: str = "us-gaap",
+    start_year: int = FRAMES_START_YEAR,
+    max_workers: int = SCRAPE_WORKERS,
+) -> pd.DataFrame:
+    """
+    Build the long frame from the XBRL frames API: one request per
+    (tag × calendar quarter) covering every filer at once, so request
+    count does not grow with the number of firms.
+
+    tickers=None keeps every filer in each frame. Units and the
+    duration / instant period type come from FRAME_UNITS and
+    INSTANT_GROUPS in config.
+    """
+
+    tag_to_label = {
+        tag: label
+        for label, group in TAG_GROUPS.items()
+        for tag in group
+    }
+
+    if tickers is None:
+        cik_to_ticker = None
+        order = {}
+    else:
+        companies = _resolve_tickers(tickers)
+        cik_to_ticker = {cik10: ticker for ticker, cik10 in companies}
+        order = {ticker: i for i, (ticker, _) in enumerate(companies)}
+
+    jobs = []
+    for tag in tags:
+        label = tag_to_label.get(tag)
+        unit = FRAME_UNITS.get(label, "USD")
+        suffix = "I" if label in INSTANT_GROUPS else ""
+
+        for period in frame_periods(start_year):
+            jobs.append((tag, unit, period + suffix))
+
+    print(f"Fetching {len(jobs)} frames ({len(tags)} tags)")
+
+    def _fetch(job):
+        tag, unit, period = job
+        df = frame_to_df(company_frame(taxonomy, tag, unit, period), cik_to_ticker)
+
+        if df.empty:
+            return None
+
+        df["source_tag"] = tag
+        return df
+
+    dfs = [df for df in _run_jobs(_fetch, jobs, max_workers) if df is not None]
+
+    if not dfs:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+
+    df = pd.concat(dfs, ignore_index=True)
+
+    # Same row order as the per-company collectors: ticker, tag, end
+    tag_order = {tag: i for i, tag in enumerate(tags)}
+    df = (
+        df
+        .assign(
+            _ticker=df["ticker"].map(order) if order else df["ticker"],
+            _tag=df["source_tag"].map(tag_order),
+        )
+        .sort_values(["_ticker", "_tag", "end"], kind="stable", na_position="last")
+        .drop(columns=["_ticker", "_tag"])
+    )
 
+    return df.reset_index(drop=True)
@@ -0,0 +1,353 @@
+from python.imports import *
+from python.config import *
+
+import gzip
+import hashlib
+import json
+import random
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -------------
+# Local SEC EDGAR stand-in server
+# -------------
+# Serves the endpoints the scrapers use, with synthetic (or recorded)
+# payloads and configurable latency, 404s, 429 throttling and hangs:
+#   /files/company_tickers.json
+#   /files/company_tickers_exchange.json
+#   /api/xbrl/companyconcept/CIK##########/<taxonomy>/<tag>.json
+#   /api/xbrl/companyfacts/CIK##########.json
+#   /api/xbrl/frames/<taxonomy>/<tag>/<unit>/CY####Q#[I].json
+#   /submissions/CIK##########.json
+# Point the scraper at it with scraping.set_sec_host(server.url).
+
+
+def _seed(*parts) -> int:
+    return int(hashlib.md5("/".join(map(str, parts)).encode()).hexdigest()[:8], 16)
+
+
+class SyntheticEdgar:
+    """
+    Deterministic synthetic filers.
+
+    Company i has CIK i + 1 and ticker "T####". Each (company, tag) pair
+    exists with probability 1 - p_missing (decided by a hash, so the
+    same pairs are missing on every run) and carries one quarterly fact
+    per quarter from `first_year` to `last_year`, each reported twice
+    (original 10-Q and a later comparative), like real filings.
+    """
+
+    # SIC codes drawn (deterministically) from a few consumer industries
+    SIC_CODES = {
+        5812: "Retail-Eating Places",
+        5411: "Retail-Grocery Stores",
+        5331: "Retail-Variety Stores",
+        7011: "Hotels & Motels",
+        2000: "Food and Kindred Products",
+    }
+
+    def __init__(
+        self,
+        n_companies: int = 31,
+        p_missing: float = 0.6,
+        first_year: int = 2011,
+        last_year: int = 2024,
+    ):
+        self.n_companies = n_companies
+        self.p_missing = p_missing
+        self.first_year = first_year
+        self.last_year = last_year
+        self.tag_to_label = {
+            tag: label for label, tags in TAG_GROUPS.items() for tag in tags
+        }
+
+    def tickers(self) -> dict:
+        return {
+            str(i): {"cik_str": i + 1, "ticker": f"T{i:04d}", "title": f"Synthetic Co {i}"}
+            for i in range(self.n_companies)
+        }
+
+    def tickers_exchange(self) -> dict:
+        return {
+            "fields": ["cik", "name", "ticker", "exchange"],
+            "data": [
+                [i + 1, f"Synthetic Co {i}", f"T{i:04d}", ("NYSE", "Nasdaq", "OTC")[i % 3]]
+                for i in range(self.n_companies)
+            ],
+        }
+
+    def sic(self, cik: int) -> int:
+        return list(self.SIC_CODES)[_seed(cik, "sic") % len(self.SIC_CODES)]
+
+    def has_tag(self, cik: int, tag: str) -> bool:
+        if not 1 <= cik <= self.n_companies:
+            return False
+        return (_seed(cik, tag) % 1000) / 1000 >= self.p_missing
+
+    def _facts(self, cik: int, tag: str) -> list[dict]:
+        base = 1e6 * (1 + _seed(cik, tag) % 500)
+        instant = self.tag_to_label.get(tag) in INSTANT_GROUPS
+        rows = []
+
+        for year in range(self.first_year, self.last_year + 1):
+            for q in range(1, 5):
+                start = pd.Timestamp(year=year, month=3 * q - 2, day=1)
+                end = start + pd.offsets.QuarterEnd(0)
+                val = round(base * (1 + 0.01 * (year - self.first_year)) * (1 + 0.05 * q))
+
+                for lag, form in ((45, "10-Q"), (410, "10-Q")):
+                    filed = end + pd.Timedelta(days=lag)
+                    row = {
+                        "end": end.strftime("%Y-%m-%d"),
+                        "val": val,
+                        "accn": f"{cik:010d}-{filed.year % 100:02d}-{_seed(cik, filed) % 10**6:06d}",
+                        "fy": filed.year,
+                        "fp": f"Q{q}" if q < 4 else "FY",
+                        "form": form if q < 4 else "10-K",
+                        "filed": filed.strftime("%Y-%m-%d"),
+                    }
+                    if not instant:
+                        row["start"] = start.strftime("%Y-%m-%d")
+                    if lag == 45:
+                        row["frame"] = f"CY{year}Q{q}" + ("I" if instant else "")
+                    rows.append(row)
+
+        return rows
+
+    def _unit(self, tag: str) -> str:
+        return FRAME_UNITS.get(self.tag_to_label.get(tag), "USD")
+
+    def concept(self, cik: int, taxonomy: str, tag: str) -> dict | None:
+        if not self.has_tag(cik, tag):
+            return None
+        return {
+            "cik": cik, "taxonomy": taxonomy, "tag": tag,
+            "units": {self._unit(tag): self._facts(cik, tag)},
+        }
+
+    def facts(self, cik: int) -> dict | None:
+        if not 1 <= cik <= self.n_companies:
+            return None
+        concepts = {
+            tag: {"units": {self._unit(tag): self._facts(cik, tag)}}
+            for tag in self.tag_to_label
+            if self.has_tag(cik, tag)
+        }
+        return {"cik": cik, "entityName": f"Synthetic Co {cik - 1}", "facts": {"us-gaap": concepts}}
+
+    def frame(self, taxonomy: str, tag: str, unit: str, period: str) -> dict | None:
+        data = []
+        for cik in range(1, self.n_companies + 1):
+            if not self.has_tag(cik, tag) or self._unit(tag) != unit:
+                continue
+            for row in self._facts(cik, tag):
+                if row.get("frame") == period:
+                    data.append({
+                        "accn": row["accn"], "cik": cik, "entityName": f"Synthetic Co {cik - 1}",
+                        "loc": "US-XX", "start": row.get("start"), "end": row["end"], "val": row["val"],
+                    })
+        if not data:
+            return None
+        return {"taxonomy": taxonomy, "tag": tag, "ccp": period, "uom": unit, "pts": len(data), "data": data}
+
+    def submissions(self, cik: int) -> dict | None:
+        if not 1 <= cik <= self.n_companies:
+            return None
+        last = pd.Timestamp(year=self.last_year, month=12, day=31) + pd.Timedelta(days=45)
+        return {
+            "cik": str(cik), "sic": str(self.sic(cik)), "sicDescription": self.SIC_CODES[self.sic(cik)],
+            "name": f"Synthetic Co {cik - 1}",
+            "filings": {"recent": {
+                "accessionNumber": [f"{cik:010d}-00-000001"],
+                "filingDate": [last.strftime("%Y-%m-%d")],
+                "form": ["10-K"],
+                "isXBRL": [1],
+            }},
+        }
+
+
+class StandinServer:
+    """
+    Threaded HTTP server in front of SyntheticEdgar (or recorded payloads).
+
+    Parameters
+    ----------
+    data : SyntheticEdgar, optional
+        Payload generator (default: 31 synthetic companies).
+    record_dir : str, optional
+        Directory of recorded payloads laid out by URL path
+        (e.g. <record_dir>/api/xbrl/companyfacts/CIK0000063908.json);
+        a recorded file takes precedence over synthetic data.
+    latency : float
+        Mean seconds added to every response (uniform ±50 % jitter).
+    p404 : float
+        Extra probability of answering 404 to an existing resource.
+    p429 : float
+        Probability of answering 429 Too Many Requests (with Retry-After).
+    p_timeout : float
+        Probability of hanging for `hang` seconds before answering.
+    seed : int
+        Seed for the random fault injection.
+    """
+
+    def __init__(
+        self,
+        data: SyntheticEdgar | None = None,
+        record_dir: str | None = None,
+        latency: float = 0.05,
+        p404: float = 0.0,
+        p429: float = 0.0,
+        p_timeout: float = 0.0,
+        hang: float = 5.0,
+        retry_after: float = 1.0,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.data = data or SyntheticEdgar()
+        self.record_dir = record_dir
+        self.latency = latency
+        self.p404 = p404
+        self.p429 = p429
+        self.p_timeout = p_timeout
+        self.hang = hang
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = Counter()      # (endpoint, status) -> responses
+        self.paths = Counter()       # path -> requests (repeats are client retries)
+        self.hangs = 0
+        self.bytes_sent = 0
+
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.counts.clear()
+            self.paths.clear()
+            self.hangs = 0
+            self.bytes_sent = 0
+
+    def _draw(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def _route(self, path: str):
+        """Return (endpoint, payload or None)."""
+
+        parts = path.strip("/").split("/")
+
+        if self.record_dir:
+            recorded = os.path.join(self.record_dir, *parts)
+            if os.path.isfile(recorded):
+                with open(recorded, "r", encoding="utf-8") as f:
+                    return parts[2] if parts[0] == "api" else parts[0], json.load(f)
+
+        def _cik(s):
+            return int(s.replace("CIK", "").replace(".json", ""))
+
+        def strip(s):
+            return s[:-len(".json")] if s.endswith(".json") else s
+
+        if parts[:2] == ["files", "company_tickers.json"]:
+            return "company_tickers", self.data.tickers()
+        if parts[:2] == ["files", "company_tickers_exchange.json"]:
+            return "company_tickers", self.data.tickers_exchange()
+        if parts[:3] == ["api", "xbrl", "companyconcept"] and len(parts) == 6:
+            return "companyconcept", self.data.concept(_cik(parts[3]), parts[4], strip(parts[5]))
+        if parts[:3] == ["api", "xbrl", "companyfacts"] and len(parts) == 4:
+            return "companyfacts", self.data.facts(_cik(parts[3]))
+        if parts[:3] == ["api", "xbrl", "frames"] and len(parts) == 7:
+            return "frames", self.data.frame(parts[3], parts[4], parts[5], strip(parts[6]))
+        if parts[0] == "submissions" and len(parts) == 2:
+            return "submissions", self.data.submissions(_cik(parts[1]))
+
+        return "unknown", None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, endpoint, status, body=b"", headers=None):
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    if body:
+                        self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client gave up (timed out) while the response was delayed
+                    self.close_connection = True
+                    return
+                with server._lock:
+                    server.counts[(endpoint, status)] += 1
+                    server.bytes_sent += len(body)
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency * (0.5 + server._draw()))
+
+                path = self.path.split("?")[0]
+                with server._lock:
+                    server.paths[path] += 1
+
+                try:
+                    endpoint, payload = server._route(path)
+                except (ValueError, IndexError):
+                    endpoint, payload = "unknown", None
+
+                if server._draw() < server.p_timeout:
+                    with server._lock:
+                        server.hangs += 1
+                    time.sleep(server.hang)
+
+                if server._draw() < server.p429:
+                    return self._send(endpoint, 429, headers={"Retry-After": str(server.retry_after)})
+
+                if payload is None or server._draw() < server.p404:
+                    return self._send(endpoint, 404)
+
+                body = json.dumps(payload).encode("utf-8")
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(endpoint, 304, headers={"ETag": etag})
+
+                headers = {"Content-Type": "application/json", "ETag": etag}
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=5)
+                    headers["Content-Encoding"] = "gzip"
+
+                self._send(endpoint, 200, body, headers)
+
+        return Handler
@@ -0,0 +1,390 @@
+from python.imports import *
+from python.config import *
+from python.scripts.functions.schema import as_category
+
+import shutil
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # CSV-only installs
+    pa = ds = feather = pq = None
+
+# -------------
+# Dataset storage: partitioned Parquet with optional CSV export
+# -------------
+# A dataset is addressed by a base path without extension:
+#   <base>/ticker=XYZ/<part>.parquet  -> partitioned Parquet dataset
+#   <base>.parquet                    -> single Parquet file (no partitions)
+#   <base>.csv                        -> CSV (STORAGE_FORMAT = "csv" or export_csv)
+
+
+def _storage_format(fmt: str | None) -> str:
+    fmt = fmt or STORAGE_FORMAT
+
+    if fmt not in ("parquet", "csv"):
+        raise ValueError("storage format must be 'parquet' or 'csv'")
+
+    if fmt == "parquet" and pq is None:
+        print("pyarrow is not installed; storing datasets as CSV")
+        return "csv"
+
+    return fmt
+
+
+def dataset_exists(path: str) -> bool:
+    return (
+        os.path.isdir(path)
+        or os.path.exists(path + ".parquet")
+        or os.path.exists(path + ".csv")
+    )
+
+
+def _replace(tmp: str, path: str) -> None:
+    """Swap a freshly written file or directory into place."""
+
+    old = path + ".old"
+    if os.path.isdir(old):
+        shutil.rmtree(old)
+
+    if os.path.isdir(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+
+    if os.path.isdir(old):
+        shutil.rmtree(old)
+
+
+def write_dataset(
+    df: pd.DataFrame,
+    path: str,
+    partition_cols: list[str] | None = None,
+    fmt: str | None = None,
+    export_csv: bool | None = None,
+) -> None:
+    """
+    Write `df` as a dataset at base path `path`.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Data to store; dtypes (datetimes, nullable ints, categoricals)
+        are kept in Parquet.
+    path : str
+        Dataset base path, without extension.
+    partition_cols : list of str, optional
+        Hive-style partition columns (default PARTITION_COLS). An empty
+        list writes one Parquet file.
+    fmt : {"parquet", "csv"}, optional
+        Defaults to STORAGE_FORMAT.
+    export_csv : bool, optional
+        Also write <path>.csv next to the Parquet data (default EXPORT_CSV).
+    """
+
+    fmt = _storage_format(fmt)
+    partition_cols = list(PARTITION_COLS if partition_cols is None else partition_cols)
+    export_csv = EXPORT_CSV if export_csv is None else export_csv
+
+    # An empty frame has no partitions; keep its schema in a single file
+    if df.empty:
+        partition_cols = []
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    if fmt == "parquet":
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        if partition_cols:
+            tmp = path + ".tmp"
+            if os.path.isdir(tmp):
+                shutil.rmtree(tmp)
+
+            pq.write_to_dataset(
+                table, tmp,
+                partition_cols=partition_cols,
+                compression=PARQUET_COMPRESSION,
+                row_group_size=PARQUET_ROW_GROUP,
+            )
+            _replace(tmp, path)
+        else:
+            pq.write_table(
+                table, path + ".parquet.tmp",
+                compression=PARQUET_COMPRESSION,
+                row_group_size=PARQUET_ROW_GROUP,
+            )
+            os.replace(path + ".parquet.tmp", path + ".parquet")
+
+    if fmt == "csv" or export_csv:
+        df.to_csv(path + ".csv.tmp", index=False)
+        os.replace(path + ".csv.tmp", path + ".csv")
+
+    _remove_stale(path, fmt, export_csv, bool(partition_cols))
+
+
+def _remove_stale(path: str, fmt: str, export_csv: bool, partitioned: bool) -> None:
+    """Drop copies left by a run with another layout, so reads never see old data."""
+
+    if (fmt == "csv" or not partitioned) and os.path.isdir(path):
+        shutil.rmtree(path)
+    if (fmt == "csv" or partitioned) and os.path.exists(path + ".parquet"):
+        os.remove(path + ".parquet")
+    if fmt == "parquet" and not export_csv and os.path.exists(path + ".csv"):
+        os.remove(path + ".csv")
+
+
+class DatasetWriter:
+    """
+    Build a dataset piece by piece (e.g. one ticker at a time) without
+    holding it in memory. Pieces go to a temporary location; commit()
+    swaps the finished dataset into place, so readers never see a
+    half-written one. Same layout and options as write_dataset.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        partition_cols: list[str] | None = None,
+        fmt: str | None = None,
+        export_csv: bool | None = None,
+    ):
+        self.path = path
+        self.fmt = _storage_format(fmt)
+        self.partition_cols = list(PARTITION_COLS if partition_cols is None else partition_cols)
+        self.export_csv = EXPORT_CSV if export_csv is None else export_csv
+        self.rows = 0
+
+        if self.fmt == "parquet" and not self.partition_cols:
+            raise ValueError("DatasetWriter needs partition columns for Parquet")
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.abort()
+
+    def append(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+
+        if self.fmt == "parquet":
+            pq.write_to_dataset(
+                pa.Table.from_pandas(df, preserve_index=False),
+                self.path + ".tmp",
+                partition_cols=self.partition_cols,
+                compression=PARQUET_COMPRESSION,
+                row_group_size=PARQUET_ROW_GROUP,
+            )
+
+        if self.fmt == "csv" or self.export_csv:
+            csv_tmp = self.path + ".csv.tmp"
+            df.to_csv(csv_tmp, mode="a", header=not os.path.exists(csv_tmp), index=False)
+
+        self.rows += len(df)
+
+    def commit(self) -> None:
+        if self.fmt == "parquet" and os.path.isdir(self.path + ".tmp"):
+            _replace(self.path + ".tmp", self.path)
+
+        if os.path.exists(self.path + ".csv.tmp"):
+            os.replace(self.path + ".csv.tmp", self.path + ".csv")
+
+        _remove_stale(self.path, self.fmt, self.export_csv, True)
+
+    def abort(self) -> None:
+        if os.path.isdir(self.path + ".tmp"):
+            shutil.rmtree(self.path + ".tmp")
+        if os.path.exists(self.path + ".csv.tmp"):
+            os.remove(self.path + ".csv.tmp")
+
+
+# pyarrow-style filters: [(col, op, value), ...], all must hold
+_OPS = {
+    "==": lambda s, v: s == v,
+    "=": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+    "<": lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    ">": lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "in": lambda s, v: s.isin(v),
+    "not in": lambda s, v: ~s.isin(v),
+}
+
+
+def _apply_filters(df: pd.DataFrame, filters) -> pd.DataFrame:
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        mask &= _OPS[op](df[col], value)
+    return df[mask].reset_index(drop=True)
+
+
+def _partition_columns(path: str) -> list[str]:
+    """Hive partition columns of a partitioned dataset, read off its directory layout."""
+
+    cols = []
+    while True:
+        subdirs = [e for e in os.scandir(path) if e.is_dir() and "=" in e.name]
+        if not subdirs:
+            return cols
+        cols.append(subdirs[0].name.split("=", 1)[0])
+        path = subdirs[0].path
+
+
+def read_dataset(
+    path: str,
+    columns: list[str] | None = None,
+    filters: list[tuple] | None = None,
+    keep_categories: bool = False,
+) -> pd.DataFrame:
+    """
+    Read a dataset written by write_dataset, whichever format it is in
+    (Parquet is preferred when both exist).
+
+    Parameters
+    ----------
+    columns : list of str, optional
+        Column projection: only these columns are read from disk.
+    filters : list of (column, op, value), optional
+        Row predicates, all of which must hold, e.g.
+        [("ticker", "in", ["MCD", "WEN"]), ("label", "==", "revenue")].
+        On Parquet, partitions and row groups that cannot match are
+        skipped without being read.
+    keep_categories : bool
+        Return Parquet categoricals (partition keys, dictionary-encoded
+        strings) as categoricals with sorted categories, as in the
+        compact fact schema, instead of plain strings. CSV is always read
+        as plain strings.
+    """
+
+    if pq is not None and (os.path.isdir(path) or os.path.exists(path + ".parquet")):
+        partition_cols = []
+        kwargs = {}
+
+        if os.path.isdir(path):
+            # Partition keys are strings: type inference would turn
+            # digit-only keys (10-digit CIKs) into integers
+            partition_cols = _partition_columns(path)
+            kwargs["partitioning"] = ds.partitioning(
+                pa.schema([(col, pa.string()) for col in partition_cols]), flavor="hive"
+            )
+
+        source = path if os.path.isdir(path) else path + ".parquet"
+        table = pq.read_table(source, columns=columns, filters=filters or None, **kwargs)
+        df = table.to_pandas()
+
+        # Dictionary-encoded strings come back as categoricals; return
+        # plain strings, as read_csv would, unless the caller works on
+        # the compact schema (partition keys included)
+        for col in df.columns:
+            is_category = isinstance(df[col].dtype, pd.CategoricalDtype)
+            if not is_category and not (keep_categories and col in partition_cols):
+                continue
+            if keep_categories:
+                df[col] = as_category(df[col])
+            else:
+                df[col] = pd.Series(np.asarray(df[col], dtype=object), index=df.index)
+
+        # Partition keys are appended last; restore the requested / written column order
+        written = [c["name"] for c in (table.schema.pandas_metadata or {}).get("columns", [])]
+        order = [c for c in (columns if columns is not None else written) if c in df.columns]
+        if len(order) == len(df.columns):
+            df = df[order]
+
+        return df
+
+    if os.path.exists(path + ".csv"):
+        usecols = None
+        if columns is not None:
+            usecols = list(dict.fromkeys(list(columns) + [f[0] for f in filters or []]))
+
+        df = pd.read_csv(path + ".csv", usecols=usecols)
+        if filters:
+            df = _apply_filters(df, filters)
+
+        return df[list(columns)] if columns is not None else df
+
+    raise FileNotFoundError(f"No dataset at {path} (.parquet, partitioned directory or .csv)")
+
+
+def remove_dataset(path: str) -> None:
+    for target in (path, path + ".tmp"):
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+    for ext in (".parquet", ".csv"):
+        if os.path.exists(path + ext):
+            os.remove(path + ext)
+
+
+# -------------
+# Arrow IPC (Feather v2) hand-off of the SCM panel to R
+# -------------
+
+# Bump when the column types below change, so R code can check what it reads
+PANEL_SCHEMA_VERSION = "1"
+
+# Columns with fixed types; every other numeric column is a float64 outcome
+PANEL_KEY_TYPES = {
+    "ticker": "dictionary",    # dictionary<int32, utf8> -> factor in R
+    "time": pa.int32() if pa else None,
+    "boycotted": pa.int8() if pa else None,
+    "time_label": "dictionary",
+}
+
+
+def _dictionary_array(values: pd.Series):
+    cat = pd.Categorical(values)
+    return pa.DictionaryArray.from_arrays(
+        pa.array(cat.codes, type=pa.int32(), mask=cat.codes < 0),
+        pa.array(cat.categories.astype(str), type=pa.string()),
+    )
+
+
+def panel_to_arrow(df: pd.DataFrame):
+    """
+    Arrow table of the SCM panel with a stable schema: key columns first
+    (dictionary-encoded ticker, int32 time, int8 boycotted, dictionary
+    time_label), then every numeric column as float64 in frame order.
+    Non-numeric columns other than the keys are rejected.
+    """
+
+    keys = [c for c in PANEL_KEY_TYPES if c in df.columns]
+    outcomes = [c for c in df.columns if c not in PANEL_KEY_TYPES]
+
+    other = [c for c in outcomes if not pd.api.types.is_numeric_dtype(df[c])]
+    if other:
+        raise TypeError(f"Non-numeric panel columns have no Arrow hand-off type: {other}")
+
+    arrays, fields = [], []
+    for col in keys + outcomes:
+        kind = PANEL_KEY_TYPES.get(col)
+
+        if kind == "dictionary":
+            arr = _dictionary_array(df[col])
+        elif kind is not None:
+            arr = pa.array(df[col].to_numpy(), type=kind)
+        else:
+            arr = pa.array(df[col].to_numpy(dtype=np.float64, na_value=np.nan), type=pa.float64())
+
+        arrays.append(arr)
+        fields.append(pa.field(col, arr.type))
+
+    schema = pa.schema(fields, metadata={"panel_schema_version": PANEL_SCHEMA_VERSION})
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_feather_panel(df: pd.DataFrame, path: str = OUTPUT_FEATHER) -> str | None:
+    """
+    Write the panel as an uncompressed Arrow IPC (Feather v2) file, which
+    R's arrow::read_feather(mmap = TRUE) maps into memory without a parse
+    step. Returns the path, or None when pyarrow is not installed.
+    """
+
+    if feather is None:
+        print("pyarrow is not installed; skipping the Arrow hand-off file")
+        return None
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # Uncompressed, so readers can memory-map the buffers as they are
+    feather.write_feather(panel_to_arrow(df), path + ".tmp", compression="uncompressed")
+    os.replace(path + ".tmp", path)
+    return path
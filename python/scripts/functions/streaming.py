@@ -0,0 +1,98 @@
+from python.imports import *
+from python.config import *
+
+import queue
+import threading
+
+# -------------
+# Bounded producer / consumer hand-off of per-ticker frames
+# -------------
+
+_DONE = object()
+
+
+class TickerStream:
+    """
+    Hand per-ticker frames from scraper threads to one consumer thread
+    through a bounded queue.
+
+    put(ticker, df) blocks while `maxsize` tickers are waiting, so at
+    most `maxsize` raw frames are held in memory however far the
+    scraper runs ahead. The consumer calls handle(ticker, df) for each
+    item in arrival order. An exception in handle() stops the stream:
+    later puts raise it, and so does close().
+
+    Use as a context manager (or call start() / close()).
+    """
+
+    def __init__(self, handle, maxsize: int = STREAM_QUEUE_SIZE):
+        self.handle = handle
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._error = None
+
+        # Telemetry: how long producers waited on a full queue vs. consumer work
+        self.items = 0
+        self.max_depth = 0
+        self.blocked_seconds = 0.0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def start(self) -> "TickerStream":
+        self._thread = threading.Thread(target=self._consume, name="ticker-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def _consume(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+
+            # After a failure keep draining so producers never block forever
+            if self._error is not None:
+                continue
+
+            t0 = time.perf_counter()
+            try:
+                self.handle(*item)
+            except BaseException as e:
+                self._error = e
+            self.busy_seconds += time.perf_counter() - t0
+            self.items += 1
+
+    def put(self, ticker: str, df: pd.DataFrame) -> None:
+        if self._error is not None:
+            raise RuntimeError("stream consumer failed") from self._error
+
+        t0 = time.perf_counter()
+        self._queue.put((ticker, df))
+
+        with self._lock:
+            self.blocked_seconds += time.perf_counter() - t0
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def _stop(self) -> None:
+        if self._thread is not None:
+            self._queue.put(_DONE)
+            self._thread.join()
+            self._thread = None
+
+    def close(self) -> None:
+        """Wait for every queued ticker to be handled."""
+
+        self._stop()
+
+        if self._error is not None:
+            raise RuntimeError("stream consumer failed") from self._error
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, *exc):
+        # A failed producer only stops the consumer; close() (which
+        # subclasses use to finalise output) runs on success only
+        if exc_type is None:
+            self.close()
+        else:
+            self._stop()
@@ -1,5 +1,6 @@
 from python.imports import *
 from python.config import *
+from python.scripts.functions.schema import own
 
 def add_label_from_source_tag(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -13,7 +14,7 @@ def add_label_from_source_tag(df: pd.DataFrame) -> pd.DataFrame:
         for tag in tags
     }
 
-    df = df.copy()
+    df = own(df)
     df["label"] = df["source_tag"].map(tag_to_label)
 
     return df
@@ -0,0 +1,179 @@
+from python.imports import *
+from python.config import *
+
+import json
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# -------------
+# Scrape telemetry
+# -------------
+
+# Upper bounds (seconds) of the per-endpoint latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, float("inf"))
+
+
+def endpoint_of(url: str) -> str:
+    """Short endpoint name of an SEC URL (companyconcept, frames, ...)."""
+
+    for name in ("companyconcept", "companyfacts", "frames", "submissions", "company_tickers"):
+        if name in url:
+            return name
+    return "other"
+
+
+class ScrapeMetrics:
+    """
+    Thread-safe collector for fetch-layer metrics.
+
+    Records per-request latency and status by endpoint, retries, 429
+    throttle events, bytes downloaded, cache hits, time spent sleeping
+    (rate limiter, retry backoff, circuit breaker), time spent parsing
+    payloads and per-ticker wall time. Every event is optionally appended
+    to a JSON lines file; summary() aggregates everything at the end of
+    a scrape.
+    """
+
+    def __init__(self, jsonl_path: str | None = None):
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._log = None
+
+        self.latencies = defaultdict(list)    # endpoint -> [seconds]
+        self.status = Counter()               # status -> responses
+        self.retries = Counter()              # endpoint -> retries
+        self.cache = Counter()                # "hit" / "revalidated" -> count
+        self.sleep = Counter()                # "rate_limit" / "backoff" / "circuit_breaker" -> seconds
+        self.bytes = 0
+        self.parse_seconds = 0.0
+        self.tickers = {}                     # ticker -> wall seconds
+        self.started = time.perf_counter()
+
+        if jsonl_path:
+            os.makedirs(os.path.dirname(jsonl_path), exist_ok=True)
+            self._log = open(jsonl_path, "w", encoding="utf-8")
+
+    def _emit(self, event: str, **fields) -> None:
+        if self._log is not None:
+            self._log.write(json.dumps({"t": round(time.time(), 3), "event": event, **fields}) + "\n")
+
+    def record_request(self, url: str, latency: float, status, nbytes: int = 0) -> None:
+        endpoint = endpoint_of(url)
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            self.status[status] += 1
+            self.bytes += nbytes
+            self._emit("request", endpoint=endpoint, url=url, status=status,
+                       latency=round(latency, 4), bytes=nbytes)
+
+    def record_retry(self, url: str, reason: str) -> None:
+        endpoint = endpoint_of(url)
+        with self._lock:
+            self.retries[endpoint] += 1
+            self._emit("retry", endpoint=endpoint, url=url, reason=reason)
+
+    def record_cache(self, url: str, outcome: str) -> None:
+        with self._lock:
+            self.cache[outcome] += 1
+            self._emit("cache", endpoint=endpoint_of(url), outcome=outcome)
+
+    def record_sleep(self, seconds: float, kind: str) -> None:
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.sleep[kind] += seconds
+
+    def record_parse(self, seconds: float) -> None:
+        with self._lock:
+            self.parse_seconds += seconds
+
+    @contextmanager
+    def timed_ticker(self, ticker: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.tickers[ticker] = self.tickers.get(ticker, 0.0) + elapsed
+                self._emit("ticker", ticker=ticker, seconds=round(elapsed, 3))
+
+    def summary(self) -> dict:
+        with self._lock:
+            endpoints = {}
+            for endpoint, lat in self.latencies.items():
+                arr = np.asarray(lat)
+                counts = np.histogram(arr, bins=(0.0,) + LATENCY_BUCKETS)[0]
+                endpoints[endpoint] = {
+                    "requests": int(arr.size),
+                    "p50": float(np.percentile(arr, 50)),
+                    "p95": float(np.percentile(arr, 95)),
+                    "max": float(arr.max()),
+                    "histogram": {
+                        f"<={b:g}s": int(n) for b, n in zip(LATENCY_BUCKETS, counts)
+                    },
+                }
+
+            return {
+                "wall_seconds": time.perf_counter() - self.started,
+                "requests": int(sum(self.status.values())),
+                "status": {str(k): v for k, v in sorted(self.status.items(), key=lambda kv: str(kv[0]))},
+                "throttled_429": self.status.get(429, 0),
+                "server_errors_5xx": sum(v for k, v in self.status.items() if isinstance(k, int) and k >= 500),
+                "retries": dict(self.retries),
+                "bytes": self.bytes,
+                "cache": dict(self.cache),
+                "network_seconds": float(sum(sum(v) for v in self.latencies.values())),
+                "sleep_seconds": dict(self.sleep),
+                "parse_seconds": self.parse_seconds,
+                "endpoints": endpoints,
+                "tickers": dict(self.tickers),
+            }
+
+    def print_summary(self) -> dict:
+        s = self.summary()
+
+        print(
+            f"Scrape: {s['requests']} requests in {s['wall_seconds']:.1f} s, "
+            f"{s['bytes'] / 1e6:.1f} MB, status {s['status']}, "
+            f"retries {sum(s['retries'].values())}, cache {s['cache']}"
+        )
+        print(
+            f"Time: network {s['network_seconds']:.1f} s, "
+            f"rate-limit sleep {s['sleep_seconds'].get('rate_limit', 0):.1f} s, "
+            f"backoff {s['sleep_seconds'].get('backoff', 0):.1f} s, "
+            f"circuit breaker {s['sleep_seconds'].get('circuit_breaker', 0):.1f} s, "
+            f"parsing {s['parse_seconds']:.1f} s (summed over threads)"
+        )
+        for endpoint, e in s["endpoints"].items():
+            print(f"  {endpoint}: n={e['requests']} p50={e['p50']:.3f}s p95={e['p95']:.3f}s max={e['max']:.3f}s")
+
+        if s["tickers"]:
+            slowest = sorted(s["tickers"].items(), key=lambda kv: -kv[1])[:5]
+            print("  slowest tickers: " + ", ".join(f"{t} {sec:.1f}s" for t, sec in slowest))
+
+        return s
+
+    def close(self) -> None:
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+
+# Active metrics for the current scrape (see reset_metrics)
+METRICS = ScrapeMetrics()
+
+
+def reset_metrics(jsonl_path: str | None = None) -> ScrapeMetrics:
+    """Start a fresh metrics collector, optionally logging events as JSON lines."""
+
+    global METRICS
+    METRICS.close()
+    METRICS = ScrapeMetrics(jsonl_path)
+    return METRICS
+
+
+def get_metrics() -> ScrapeMetrics:
+    return METRICS
@@ -0,0 +1,153 @@
+from python.imports import *
+from python.config import *
+
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+
+# -------------
+# Pooled HTTP session
+# -------------
+
+class SecRequestError(requests.exceptions.RequestException):
+    """Raised when a request still fails after every retry."""
+
+
+def make_session(pool_size: int = SCRAPE_WORKERS) -> requests.Session:
+    """
+    One keep-alive session for every SEC request: connections (and their
+    TLS handshakes) are reused across requests and threads, and
+    responses are gzip-compressed on the wire.
+
+    Retries are handled by the caller (see scraping._get_json) so every
+    attempt passes through the rate limiter and the circuit breaker.
+    """
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(pool_size, 1), max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+# -------------
+# Backoff
+# -------------
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(
+    attempt: int,
+    retry_after: float | None = None,
+    base: float = SEC_BACKOFF_BASE,
+    cap: float = SEC_BACKOFF_MAX,
+) -> float:
+    """
+    Exponential backoff with full jitter: uniform in [0, min(cap, base * 2**attempt)],
+    so retrying threads do not hit the server in lockstep. A server-sent
+    Retry-After is a lower bound.
+    """
+
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+
+    return delay
+
+
+# -------------
+# Circuit breaker
+# -------------
+
+class CircuitBreaker:
+    """
+    Pause every request of the process once SEC starts throttling.
+
+    `threshold` throttled (429 / 503) responses within `window` seconds
+    open the breaker: all threads block in wait() for `cooldown` seconds
+    (or the longest Retry-After seen, if longer). After the pause the
+    breaker is half-open; the next success closes it, another throttle
+    opens it again with a doubled cooldown (up to `max_cooldown`).
+    """
+
+    def __init__(
+        self,
+        threshold: int = SEC_BREAKER_THRESHOLD,
+        window: float = SEC_BREAKER_WINDOW,
+        cooldown: float = SEC_BREAKER_COOLDOWN,
+        max_cooldown: float = SEC_BREAKER_MAX_COOLDOWN,
+    ):
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self._lock = threading.Lock()
+        self._throttles = []
+        self._open_until = 0.0
+        self._half_open = False
+        self._current_cooldown = cooldown
+        self.trips = 0
+
+    def wait(self) -> float:
+        """Block while the breaker is open. Returns seconds waited."""
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                delay = self._open_until - time.monotonic()
+            if delay <= 0:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def record_throttle(self, retry_after: float | None = None) -> None:
+        with self._lock:
+            now = time.monotonic()
+
+            # Requests already in flight when the breaker opened
+            if now < self._open_until:
+                return
+
+            self._throttles = [t for t in self._throttles if now - t <= self.window] + [now]
+
+            if self._half_open:
+                self._current_cooldown = min(self.max_cooldown, 2 * self._current_cooldown)
+            elif len(self._throttles) < self.threshold:
+                return
+
+            pause = max(self._current_cooldown, retry_after or 0.0)
+            self._open_until = now + pause
+            self._half_open = True
+            self._throttles = []
+            self.trips += 1
+
+        print(f"SEC is throttling requests; pausing all requests for {pause:.0f} s")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._half_open and time.monotonic() >= self._open_until:
+                self._half_open = False
+                self._current_cooldown = self.cooldown
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return time.monotonic() < self._open_until
@@ -0,0 +1,235 @@
+from python.imports import *
+from python.config import *
+from python.scripts.functions.storage import read_dataset, write_dataset
+from python.scripts.functions.scraping import (
+    _run_jobs,
+    company_submissions,
+    load_exchange_listing,
+)
+
+import json
+import re
+import zipfile
+
+# -------------
+# Industry universe: SIC-based filer selection
+# -------------
+
+UNIVERSE_COLUMNS = ["cik", "ticker", "name", "exchange", "sic", "sic_description", "industry"]
+
+
+def parse_sic_ranges(codes: list[str]) -> list[tuple[int, int]]:
+    """
+    Parse SIC codes and inclusive ranges into (low, high) pairs.
+
+    "5812" -> (5812, 5812); "5400-5499" -> (5400, 5499).
+    """
+
+    ranges = []
+    for code in codes:
+        lo, _, hi = str(code).strip().partition("-")
+        ranges.append((int(lo), int(hi or lo)))
+    return ranges
+
+
+def industry_sic_codes(industries: list[str]) -> dict[str, list[tuple[int, int]]]:
+    """SIC ranges of each named industry in SIC_INDUSTRIES."""
+
+    unknown = [name for name in industries if name not in SIC_INDUSTRIES]
+    if unknown:
+        raise ValueError(f"Unknown industries {unknown}; choose from {sorted(SIC_INDUSTRIES)}")
+
+    return {name: parse_sic_ranges(SIC_INDUSTRIES[name]) for name in industries}
+
+
+def _sic_profile(cik10: str, j: dict | None) -> dict:
+    j = j or {}
+    sic = str(j.get("sic") or "").strip()
+    return {
+        "cik": cik10,
+        "sic": int(sic) if sic.isdigit() else pd.NA,
+        "sic_description": j.get("sicDescription") or None,
+    }
+
+
+def iter_submissions_zip(zip_path: str = SUBMISSIONS_ZIP, ciks: list[str] | None = None):
+    """
+    Yield (cik10, payload) from SEC's bulk submissions.zip.
+
+    Only the main CIK##########.json members carry the SIC code; the
+    CIK##########-submissions-###.json members (older filings) are skipped.
+    """
+
+    pattern = re.compile(r"CIK(\d{10})\.json$")
+    wanted = set(ciks) if ciks is not None else None
+
+    with zipfile.ZipFile(zip_path) as zf:
+        for name in zf.namelist():
+            m = pattern.search(os.path.basename(name))
+            if not m or (wanted is not None and m.group(1) not in wanted):
+                continue
+
+            with zf.open(name) as f:
+                yield m.group(1), json.load(f)
+
+
+def load_sic_codes(
+    ciks: list[str],
+    zip_path: str = SUBMISSIONS_ZIP,
+    max_workers: int = SCRAPE_WORKERS,
+) -> pd.DataFrame:
+    """
+    SIC code and description of each CIK.
+
+    Read from a local submissions.zip when present; otherwise one
+    submissions request per CIK, served from the HTTP cache for
+    UNIVERSE_TTL so reruns of a universe selection are free.
+    """
+
+    if os.path.exists(zip_path):
+        rows = [_sic_profile(cik10, j) for cik10, j in iter_submissions_zip(zip_path, ciks)]
+        found = {r["cik"] for r in rows}
+        rows += [_sic_profile(cik10, None) for cik10 in ciks if cik10 not in found]
+    else:
+        print(f"Looking up SIC codes of {len(ciks)} filers (one submissions request each)")
+        rows = _run_jobs(
+            lambda cik10: _sic_profile(cik10, company_submissions(cik10, ttl=UNIVERSE_TTL)),
+            list(ciks),
+            max_workers,
+        )
+
+    return pd.DataFrame(rows, columns=["cik", "sic", "sic_description"])
+
+
+def select_universe(
+    sic: list[str] | None = None,
+    industries: list[str] | None = None,
+    exchanges: list[str] | None = UNIVERSE_EXCHANGES,
+    include: list[str] | None = None,
+    max_workers: int = SCRAPE_WORKERS,
+) -> pd.DataFrame:
+    """
+    Select every SEC filer in the given industries.
+
+    Parameters
+    ----------
+    sic : list of str, optional
+        SIC codes or inclusive ranges ("5812", "5400-5499").
+    industries : list of str, optional
+        Names from SIC_INDUSTRIES.
+    exchanges : list of str, optional
+        Keep only filers listed on these exchanges (None keeps all).
+    include : list of str, optional
+        Tickers kept regardless of industry or exchange (e.g. the treated
+        firm and hand-picked donors from config.tickers).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per CIK (its first-listed ticker; share classes share a
+        CIK), sorted by CIK, with UNIVERSE_COLUMNS. `industry` is the
+        first matching name from `industries`, "sic" for a match on
+        `sic` only, and missing for `include`-only firms.
+    """
+
+    groups = industry_sic_codes(industries or [])
+    if sic:
+        groups["sic"] = parse_sic_ranges(sic)
+    if not groups:
+        raise ValueError("select_universe needs sic codes or industries")
+
+    listing = load_exchange_listing()
+    include = {t.upper() for t in (include or [])}
+
+    listed = listing if exchanges is None else listing[listing["exchange"].isin(exchanges)]
+    firms = pd.concat([listed, listing[listing["ticker"].isin(include)]])
+    firms = firms.drop_duplicates("cik").reset_index(drop=True)
+
+    df = firms.merge(load_sic_codes(firms["cik"].tolist(), max_workers=max_workers), on="cik", how="left")
+
+    sic_codes = pd.to_numeric(df["sic"], errors="coerce")
+    df["industry"] = pd.Series(pd.NA, index=df.index, dtype="object")
+
+    for name, ranges in groups.items():
+        hit = pd.Series(False, index=df.index)
+        for lo, hi in ranges:
+            hit |= sic_codes.between(lo, hi)
+        df.loc[hit & df["industry"].isna(), "industry"] = name
+
+    keep = df["industry"].notna() | df["ticker"].isin(include)
+    df = df[keep].sort_values("cik").reset_index(drop=True)
+
+    print(
+        f"Universe: {len(df)} filers "
+        f"({df['industry'].value_counts().to_dict()}, {int(df['industry'].isna().sum())} included by ticker)"
+    )
+
+    return df[UNIVERSE_COLUMNS]
+
+
+# -------------
+# CIK-range shards and partitioned raw output
+# -------------
+
+def assign_shards(universe: pd.DataFrame, n_shards: int = UNIVERSE_SHARDS) -> pd.DataFrame:
+    """
+    Split the universe into `n_shards` contiguous CIK ranges of (nearly)
+    equal firm counts and add a `shard` column named after the range,
+    e.g. "CIK0000063908-0000320193".
+    """
+
+    df = universe.sort_values("cik").reset_index(drop=True)
+    df["shard"] = ""
+
+    for idx in np.array_split(np.arange(len(df)), min(n_shards, len(df)) or 1):
+        if len(idx):
+            ciks = df["cik"].iloc[idx]
+            df.loc[idx, "shard"] = f"CIK{ciks.iloc[0]}-{ciks.iloc[-1]}"
+
+    return df
+
+
+def shard_path(shard: str, root: str = DATA_UNIVERSE) -> str:
+    """Dataset base path of one shard (see functions/storage.py)."""
+    return os.path.join(root, shard)
+
+
+def write_shard(df: pd.DataFrame, shard: str, root: str = DATA_UNIVERSE) -> str:
+    """Write one shard's facts (atomically: a crash never leaves half a shard)."""
+
+    path = shard_path(shard, root)
+    write_dataset(df, path)
+    return path
+
+
+def list_shards(root: str = DATA_UNIVERSE) -> list[str]:
+    if not os.path.isdir(root):
+        return []
+
+    names = set()
+    for name in os.listdir(root):
+        if not name.startswith("CIK") or name.endswith((".tmp", ".old")):
+            continue
+        names.add(name.split(".")[0])
+
+    return sorted(names)
+
+
+def read_shards(
+    root: str = DATA_UNIVERSE,
+    shards: list[str] | None = None,
+    tickers: list[str] | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """Concatenate shards (all by default), optionally keeping only `tickers` / `columns`."""
+
+    filters = [("ticker", "in", list(tickers))] if tickers is not None else None
+    dfs = [
+        read_dataset(shard_path(shard, root), columns=columns, filters=filters)
+        for shard in (shards if shards is not None else list_shards(root))
+    ]
+
+    if not dfs:
+        return pd.DataFrame()
+
+    return pd.concat(dfs, ignore_index=True)
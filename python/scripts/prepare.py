@@ -3,15 +3,13 @@ from python.config import *
 from python.scripts.functions.preprocessing import *
 from python.scripts.functions.scraping import *
 from python.scripts.functions.tagging import *
+from python.scripts.functions.storage import *
+from python.scripts.functions.schema import ingest_facts, owned_frames
 
-def prepare():
-    # -----------------
-    # Load raw data
-    # -----------------
-    input_path = os.path.join(DATA_PROCESSED, "financials_clean.csv")
-    output_path = os.path.join(OUTPUTS, "data.csv")
+def prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Build the SCM panel from clean long facts (no I/O)."""
 
-    df = pd.read_csv(input_path)
+    df = ingest_facts(df)
 
     df = add_scm_time_index(df)
 
@@ -78,14 +76,35 @@ def prepare():
     )
     df = add_time_label_from_scm(df)
 
+    return df
+
+
+def prepare(df: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Build the SCM panel from clean facts: `df` when given (e.g. straight
+    from preprocess()), otherwise the clean dataset on disk.
+    """
+
+    # -----------------
+    # Load clean data (unless handed over in memory)
+    # -----------------
+    if df is None:
+        df = read_dataset(CLEAN_DATASET, keep_categories=True)
+
+    df = prepare_frame(df)
+
     # -----------------
     # Save output
     # -----------------  
 
-    df.to_csv(output_path, index=False)
+    # One file (the panel is small), a CSV copy, and the typed Arrow IPC
+    # file that the R scripts memory-map (r/setup.r falls back to the CSV)
+    write_dataset(df, OUTPUT_DATASET, partition_cols=[], export_csv=True)
+    write_feather_panel(df, OUTPUT_FEATHER)
 
     return df
 
 
 if __name__ == "__main__":
-    prepare()
+    with owned_frames(COPY_FREE):
+        prepare()
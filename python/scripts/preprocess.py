@@ -3,15 +3,28 @@ from python.config import *
 from python.scripts.functions.preprocessing import *
 from python.scripts.functions.scraping import *
 from python.scripts.functions.tagging import *
+from python.scripts.functions.storage import *
+from python.scripts.functions.schema import concat_facts, ingest_facts, memory_mb, owned_frames
+from python.scripts.functions.dedup import MAX_INTERVAL_RULE, OBSERVATION_RULE, deduplicate, format_report
+from python.scripts.functions.streaming import TickerStream
+from python.scripts.functions.universe import list_shards, shard_path, write_shard
+
+import argparse
+
+def preprocess_frame(df: pd.DataFrame, report: dict | None = None) -> pd.DataFrame:
+    """
+    Run every preprocessing step on a raw long frame. All steps work
+    within a ticker, so any set of whole tickers can be processed on
+    its own (e.g. one CIK-range shard of a universe scrape).
+
+    Rows removed by each deduplication rule are added to `report`.
+    """
 
-def preprocess():
     # -----------------
-    # Load raw data
+    # Typed ingest: parse and compact every column once; the steps
+    # below only check dtypes instead of reconverting
     # -----------------
-    input_path = os.path.join(DATA_RAW, "financials.csv")
-    output_path = os.path.join(DATA_PROCESSED, "financials_clean.csv")
-
-    df = pd.read_csv(input_path)
+    df = ingest_facts(df)
 
      # -----------------
     # Add year and quarter
@@ -24,14 +37,10 @@ def preprocess():
     df = filter_quarterly_intervals(df)
 
     # -----------------
-    # Collapse frame duplicates
-    # -----------------
-    df = collapse_duplicates_ignoring_frame(df)
-
-    # -----------------
-    # Deduplicate by latest filing
+    # Collapse frame duplicates (the latest-filing pass that used to
+    # follow shares the key and has nothing left to remove)
     # -----------------
-    df = deduplicate_by_latest_filing(df)
+    df, removed = deduplicate(df, [OBSERVATION_RULE], return_report=True)
 
     # -----------------
     # Dominant source tag
@@ -41,17 +50,148 @@ def preprocess():
     # -----------------
     # Keep max interval when conflicts exist
     # -----------------
-    df = keep_max_interval_observation(df)
+    df, removed_interval = deduplicate(df, [MAX_INTERVAL_RULE], return_report=True)
+
+    if report is not None:
+        for name, n in {**removed, **removed_interval}.items():
+            report[name] = report.get(name, 0) + n
+
+    return df
+
+
+def preprocess(
+    df: pd.DataFrame | None = None,
+    universe: bool = False,
+    save: bool = True,
+) -> pd.DataFrame:
+    """
+    Clean raw facts: `df` when given (e.g. straight from scrape()),
+    otherwise the raw dataset on disk. With `save`, the result is also
+    written to CLEAN_DATASET.
+    """
+
+    # -----------------
+    # Industry universe: preprocess shard by shard, so memory is bounded
+    # by the largest shard rather than the whole universe
+    # -----------------
+    if universe:
+        shards = list_shards(DATA_UNIVERSE)
+        if not shards:
+            raise FileNotFoundError(f"No universe shards in {DATA_UNIVERSE}; run scrapper.py --industry first")
+
+        dfs = []
+        for shard in shards:
+            report = {}
+            clean = preprocess_frame(read_dataset(shard_path(shard, DATA_UNIVERSE), keep_categories=True), report)
+            write_shard(clean, shard, DATA_UNIVERSE_CLEAN)
+            print(
+                f"[{shard}] {clean['ticker'].nunique()} tickers, {len(clean)} rows "
+                f"(rows removed: {format_report(report)})"
+            )
+            dfs.append(clean)
+
+        # Clean facts are a small fraction of raw; prepare() reads them in one piece
+        df = concat_facts(dfs)
+        if save:
+            write_dataset(df, CLEAN_DATASET)
+        return df
+
+    # -----------------
+    # Load raw data (unless handed over in memory)
+    # -----------------
+    if df is None:
+        df = read_dataset(RAW_DATASET, keep_categories=True)
+    loaded_mb = memory_mb(df)
+
+    df = ingest_facts(df)
+    print(f"Raw facts: {len(df)} rows, {memory_mb(df):.1f} MB in memory ({loaded_mb:.1f} MB as loaded)")
+
+    report = {}
+    df = preprocess_frame(df, report)
+    print(f"Deduplication (rows removed): {format_report(report)}")
 
     # -----------------
     # Save processed data
     # -----------------
+    if save:
+        write_dataset(df, CLEAN_DATASET)
 
-    df.to_csv(output_path, index=False)
     return df
 
 
-if __name__ == "__main__":
-    preprocess()
+class StreamingPreprocessor(TickerStream):
+    """
+    Consumer side of a streaming scrape: each ticker's raw facts are
+    added to the raw dataset and preprocessed as soon as they arrive,
+    so raw data for at most `maxsize` tickers is held in memory.
+
+    On close(), the raw dataset (built in a temporary location until
+    then), watermark.csv and the clean dataset are saved in one go; the
+    cleaned frame is available as `result`. `save_raw` / `save_clean`
+    turn either save off, e.g. when `result` is handed straight to
+    prepare().
+
+    Example
+    -------
+    >>> with StreamingPreprocessor() as pre:
+    ...     scrape(on_ticker=pre.put)
+    >>> df = pre.result
+    """
+
+    def __init__(self, maxsize: int = STREAM_QUEUE_SIZE, save_raw: bool = True, save_clean: bool = True):
+        super().__init__(self._handle, maxsize)
+
+        self.watermark_path = os.path.join(DATA_RAW, "watermark.csv")
+        self.save_clean = save_clean
+        self._raw = DatasetWriter(RAW_DATASET) if save_raw else None
+        self._clean = []
+        self._watermarks = []
+        self.dedup_report = {}
+        self.result = None
+
+    def _handle(self, ticker: str, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
 
+        if self._raw is not None:
+            self._raw.append(df)
+            self._watermarks.append(compute_watermark(df))
+        self._clean.append(preprocess_frame(df, self.dedup_report))
+
+    def close(self) -> None:
+        super().close()
+
+        if not self._clean:
+            raise RuntimeError("Streaming scrape produced no facts")
+
+        if self._raw is not None:
+            self._raw.commit()
+            pd.concat(self._watermarks, ignore_index=True).to_csv(self.watermark_path, index=False)
+
+        self.result = concat_facts(self._clean)
+        if self.save_clean:
+            write_dataset(self.result, CLEAN_DATASET)
+
+        print(
+            f"Streamed {self.items} tickers: preprocessing busy {self.busy_seconds:.1f} s, "
+            f"scraper blocked on a full queue {self.blocked_seconds:.1f} s, "
+            f"max queue depth {self.max_depth}"
+        )
+        print(f"Deduplication (rows removed): {format_report(self.dedup_report)}")
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            super().__exit__(exc_type, *exc)
+        finally:
+            # Nothing was committed (scrape or preprocessing failed): drop partial raw data
+            if self.result is None and self._raw is not None:
+                self._raw.abort()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean scraped SEC facts.")
+    parser.add_argument("--universe", action="store_true", help="preprocess the industry-universe shards")
+    args = parser.parse_args()
 
+    with owned_frames(COPY_FREE):
+        preprocess(universe=args.universe)
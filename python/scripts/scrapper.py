@@ -3,8 +3,53 @@ from python.config import *
 from python.scripts.functions.preprocessing import *
 from python.scripts.functions.scraping import *
 from python.scripts.functions.tagging import *
+from python.scripts.functions.storage import *
+from python.scripts.functions.telemetry import reset_metrics
+from python.scripts.functions.universe import *
+
+import argparse
+
+# Available collectors: one request per (ticker × tag), one per company,
+# one per (tag × quarter) for all filers, or none (local companyfacts.zip)
+COLLECTORS = {
+    "concept": collect_concepts_long,
+    "facts": collect_facts_long,
+    "frames": collect_frames_long,
+    "bulk": collect_bulk_long,
+}
+
+# Collectors that can cover every filer rather than `tickers`
+UNIVERSE_COLLECTORS = {"frames", "bulk"}
+
+# Collectors that checkpoint each finished ticker (see ShardStore)
+CHECKPOINT_COLLECTORS = {"concept", "facts"}
+
+def scrape(
+    method: str = SCRAPE_METHOD,
+    universe: bool = False,
+    incremental: bool = False,
+    resume: bool = False,
+    dry_run: bool = False,
+    on_ticker=None,
+    save: bool = True,
+    checkpoint: bool | None = None,
+) -> pd.DataFrame | None:
+    """
+    Scrape `tickers` (or every filer with `universe`) and return the
+    labelled raw facts. With `save`, they are also written to the raw
+    dataset (RAW_DATASET) together with watermark.csv; an incremental
+    scrape always saves, since it merges into that dataset.
+
+    With `checkpoint` (default: `save`) or `resume`, the concept and
+    facts collectors also checkpoint each finished ticker under
+    DATA_SHARDS; otherwise the facts are only held in memory.
+
+    With `on_ticker`, each ticker's labelled facts are handed to
+    on_ticker(ticker, df) as soon as they are fetched and nothing is
+    written or returned here; the receiver owns the raw output (see
+    preprocess.StreamingPreprocessor).
+    """
 
-def scrape():
     # -----------------------------------
     # Flatten all tags from all tag groups
     # -----------------------------------
@@ -17,23 +62,247 @@ def scrape():
     # -----------------
     # Collect SEC data
     # -----------------
-    df_raw = collect_concepts_long(tickers, tags)
+    if method not in COLLECTORS:
+        raise ValueError(f"method must be one of {sorted(COLLECTORS)}")
+
+    # Whole-universe scrapes are only practical cross-sectionally
+    if universe and method not in UNIVERSE_COLLECTORS:
+        raise ValueError(f"universe=True requires method in {sorted(UNIVERSE_COLLECTORS)}")
+
+    if universe and incremental:
+        raise ValueError("incremental scrapes need an explicit ticker list")
+
+    if on_ticker is not None and (method not in CHECKPOINT_COLLECTORS or universe or incremental or resume):
+        raise ValueError(
+            f"streaming needs method in {sorted(CHECKPOINT_COLLECTORS)} "
+            "without universe, incremental or resume"
+        )
+
+    metrics = reset_metrics(SCRAPE_METRICS_LOG)
+
+    watermark_path = os.path.join(DATA_RAW, "watermark.csv")
+
+    scope = None if universe else tickers
+
+    # -----------------
+    # Incremental: only companies with filings past the watermark
+    # -----------------
+    incremental = (
+        incremental
+        and dataset_exists(RAW_DATASET)
+        and os.path.exists(watermark_path)
+    )
+
+    if incremental:
+        scope = stale_tickers(scope, pd.read_csv(watermark_path))
+
+        if not scope:
+            print("Raw data is up to date; nothing to scrape.")
+            metrics.close()
+            return
 
     # -----------------
-    # Add semantic label
+    # Plan requests (skip known-missing tags) and estimate cost
     # -----------------
-    df = add_label_from_source_tag(df_raw)
+    coverage = CoverageIndex()
+    plan = plan_requests(method, scope, tags, coverage=coverage)
+
+    print(
+        f"Plan: {plan['requests']} requests "
+        f"({plan['cached']} cached, {plan['known_missing']} known missing), "
+        f"~{plan['seconds'] / 60:.1f} min at {SEC_MAX_RPS} req/s"
+    )
+
+    if dry_run:
+        metrics.close()
+        return
 
     # -----------------
-    # Save & inspect
+    # Per-ticker checkpoints (resume skips finished tickers),
+    # or per-ticker hand-off to a streaming consumer
     # -----------------
-    output_path = os.path.join(DATA_RAW, "financials.csv")
+    if checkpoint is None:
+        checkpoint = save
+
+    kwargs = {}
+    if method in CHECKPOINT_COLLECTORS:
+        kwargs["coverage"] = coverage
+
+    if on_ticker is not None:
+        kwargs["on_ticker"] = lambda ticker, df: on_ticker(ticker, add_label_from_source_tag(df))
+    elif method in CHECKPOINT_COLLECTORS and (checkpoint or resume):
+        kwargs["store"] = ShardStore(
+            DATA_SHARDS,
+            signature=ShardStore.make_signature(method, tags, scope),
+            resume=resume,
+        )
+
+    df_raw = COLLECTORS[method](scope, tags, **kwargs)
+
+    if on_ticker is None:
+        # -----------------
+        # Add semantic label
+        # -----------------
+        df = add_label_from_source_tag(df_raw)
+
+        if incremental:
+            df = merge_raw_facts(read_dataset(RAW_DATASET), df)
+
+        # -----------------
+        # Save & inspect
+        # -----------------
+        if save or incremental:
+            write_dataset(df, RAW_DATASET)
+            compute_watermark(df).to_csv(watermark_path, index=False)
+
+    # Keep the HTTP cache within its size / age budget
+    evict_cache()
+
+    stats = limiter_stats()
+    print(
+        f"Rate limiter: {stats['rate']:.1f} req/s (last 10 s), "
+        f"mean queueing delay {stats['mean_wait']:.2f} s over {stats['acquired']} requests"
+    )
+
+    # Fetch-layer telemetry (per-request events are in SCRAPE_METRICS_LOG)
+    metrics.print_summary()
+    metrics.close()
+
+    if on_ticker is None:
+        print(df.head())
+        return df
 
-    df.to_csv(output_path, index=False)
 
-    print(df.head())
+def scrape_universe(
+    method: str = "facts",
+    sic: list[str] | None = None,
+    industries: list[str] | None = None,
+    n_shards: int = UNIVERSE_SHARDS,
+    shard: int | None = None,
+    resume: bool = False,
+    dry_run: bool = False,
+):
+    """
+    Scrape every filer in the given SIC codes / industries (plus the
+    hand-picked `tickers`) into one raw dataset per CIK-range shard under
+    DATA_UNIVERSE. `shard` scrapes only that shard, so N processes can
+    split a universe (they share the host-wide rate limiter).
+    """
+
+    tags = sorted({
+        tag
+        for tag_list in TAG_GROUPS.values()
+        for tag in tag_list
+    })
+
+    if method not in COLLECTORS:
+        raise ValueError(f"method must be one of {sorted(COLLECTORS)}")
+
+    metrics = reset_metrics(SCRAPE_METRICS_LOG)
+
+    # -----------------
+    # Select filers and split them into CIK ranges
+    # -----------------
+    universe = assign_shards(select_universe(sic, industries, include=tickers), n_shards)
+
+    os.makedirs(DATA_UNIVERSE, exist_ok=True)
+    universe_path = os.path.join(DATA_UNIVERSE, "universe.csv")
+    universe.to_csv(universe_path + ".tmp", index=False)
+    os.replace(universe_path + ".tmp", universe_path)
+
+    shards = list(dict.fromkeys(universe["shard"]))
+    if shard is not None:
+        shards = [shards[shard]]
+
+    if resume:
+        done = [name for name in shards if dataset_exists(shard_path(name))]
+        if done:
+            print(f"Resuming: {len(done)} of {len(shards)} shards already scraped")
+        shards = [name for name in shards if name not in done]
+
+    scope = universe[universe["shard"].isin(shards)]
+
+    # -----------------
+    # Plan requests and estimate cost
+    # -----------------
+    coverage = CoverageIndex()
+    plan = plan_requests(method, scope["ticker"].tolist(), tags, coverage=coverage)
+
+    print(
+        f"Plan: {len(scope)} filers in {len(shards)} shards, {plan['requests']} requests "
+        f"({plan['cached']} cached, {plan['known_missing']} known missing), "
+        f"~{plan['seconds'] / 60:.1f} min at {SEC_MAX_RPS} req/s"
+    )
+
+    if dry_run or scope.empty:
+        metrics.close()
+        return universe
+
+    # -----------------
+    # Collect: per-company collectors run shard by shard (with per-ticker
+    # checkpoints); cross-sectional ones run once and are split by shard
+    # -----------------
+    if method in CHECKPOINT_COLLECTORS:
+        for name in shards:
+            shard_tickers = scope.loc[scope["shard"] == name, "ticker"].tolist()
+            print(f"[{name}] Scraping {len(shard_tickers)} filers")
+
+            store = ShardStore(
+                os.path.join(DATA_SHARDS, name),
+                signature=ShardStore.make_signature(method, tags, shard_tickers),
+                resume=resume,
+            )
+            df = COLLECTORS[method](shard_tickers, tags, store=store, coverage=coverage)
+            write_shard(add_label_from_source_tag(df), name)
+    else:
+        df = add_label_from_source_tag(COLLECTORS[method](scope["ticker"].tolist(), tags))
+        shard_of = df["ticker"].map(scope.set_index("ticker")["shard"])
+
+        for name in shards:
+            write_shard(df[shard_of == name], name)
+
+    evict_cache()
+
+    metrics.print_summary()
+    metrics.close()
+
+    return universe
 
 if __name__ == "__main__":
-    scrape()
+    parser = argparse.ArgumentParser(description="Scrape SEC XBRL financials.")
+    parser.add_argument("--method", choices=sorted(COLLECTORS), default=SCRAPE_METHOD)
+    parser.add_argument("--offline", action="store_true", help="serve every request from the HTTP cache")
+    parser.add_argument("--universe", action="store_true", help="every filer, not just tickers (frames / bulk only)")
+    parser.add_argument("--incremental", action="store_true", help="only refetch companies with new filings")
+    parser.add_argument("--resume", action="store_true", help="skip tickers checkpointed by an interrupted run")
+    parser.add_argument("--dry-run", action="store_true", help="only print the request plan and time estimate")
+    parser.add_argument("--sic", nargs="+", help="scrape every filer with these SIC codes / ranges (e.g. 5812 5400-5499)")
+    parser.add_argument("--industry", nargs="*", help=f"scrape every filer in these industries (default {UNIVERSE_INDUSTRIES})")
+    parser.add_argument("--shards", type=int, default=UNIVERSE_SHARDS, help="CIK-range shards of an industry universe")
+    parser.add_argument("--shard", type=int, help="scrape only this shard (0-based) of an industry universe")
+    args = parser.parse_args()
+
+    if args.offline:
+        set_offline(True)
 
+    if args.sic or args.industry is not None:
+        if args.universe or args.incremental:
+            parser.error("--sic / --industry cannot be combined with --universe or --incremental")
 
+        scrape_universe(
+            method=args.method,
+            sic=args.sic,
+            industries=args.industry if args.industry or args.sic else UNIVERSE_INDUSTRIES,
+            n_shards=args.shards,
+            shard=args.shard,
+            resume=args.resume,
+            dry_run=args.dry_run,
+        )
+    else:
+        scrape(
+            method=args.method,
+            universe=args.universe,
+            incremental=args.incremental,
+            resume=args.resume,
+            dry_run=args.dry_run,
+        )
@@ -0,0 +1,36 @@
+from python.imports import *
+
+import pytest
+
+import python.scripts.benchmark as benchmark
+import python.scripts.functions.http_cache as http_cache
+import python.scripts.functions.scraping as scraping
+
+
+def _scraper_state() -> dict:
+    state = {name: vars(scraping).get(name) for name in benchmark.BENCH_RESTORED_GLOBALS}
+    state["CACHE_DIR"] = http_cache.CACHE_DIR
+    return state
+
+
+def test_run_benchmark_restores_scraper_globals():
+    before = _scraper_state()
+
+    report = benchmark.run_benchmark(methods=["facts"], n_companies=2, latency=0.0, rps=500)
+
+    assert report["error"].isna().all()
+    assert _scraper_state() == before
+
+
+def test_run_benchmark_restores_scraper_globals_on_error(monkeypatch):
+    before = _scraper_state()
+
+    def failing_server(*args, **kwargs):
+        raise RuntimeError("stand-in failed to start")
+
+    monkeypatch.setattr(benchmark, "StandinServer", failing_server)
+
+    with pytest.raises(RuntimeError):
+        benchmark.run_benchmark(methods=["facts"], n_companies=2, timeout=0.5)
+
+    assert _scraper_state() == before
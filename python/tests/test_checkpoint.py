@@ -0,0 +1,47 @@
+from python.imports import *
+from python.scripts.functions.checkpoint import ShardStore
+from python.scripts.functions.columnar import FACT_COLUMNS
+from python.scripts.functions.schema import compact_facts
+
+
+def _ticker_facts(ticker: str, n: int) -> pd.DataFrame:
+    end = pd.date_range("2020-03-31", periods=n, freq="QE")
+    return compact_facts(pd.DataFrame({
+        "start": end - pd.Timedelta(days=90),
+        "end": end,
+        "val": np.arange(n, dtype=float),
+        "accn": [f"{ticker}-{i}" for i in range(n)],
+        "fy": pd.array(end.year, dtype="Int64"),
+        "fp": "Q1",
+        "form": "10-Q",
+        "filed": end + pd.Timedelta(days=30),
+        "frame": None,
+        "ticker": ticker,
+        "source_tag": "Revenues",
+    }, columns=FACT_COLUMNS))
+
+
+def test_shards_are_parquet_and_keep_dtypes(tmp_path):
+    store = ShardStore(str(tmp_path), signature="s")
+    store.write("WEN", _ticker_facts("WEN", 3))
+    store.write("MCD", _ticker_facts("MCD", 2))
+    store.write("YUM", None)
+
+    assert sorted(os.listdir(tmp_path)) == ["MCD.parquet", "WEN.parquet", "manifest.json"]
+
+    df = ShardStore(str(tmp_path), signature="s", resume=True).consolidate(["WEN", "MCD", "YUM"])
+
+    assert df["ticker"].tolist() == ["WEN"] * 3 + ["MCD"] * 2
+    assert df["ticker"].cat.categories.tolist() == ["MCD", "WEN"]
+    assert isinstance(df["accn"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_dtype(df["filed"].dtype)
+    assert df["fy"].dtype == "Int64"
+
+
+def test_other_signature_clears_shards(tmp_path):
+    ShardStore(str(tmp_path), signature="s").write("WEN", _ticker_facts("WEN", 1))
+
+    store = ShardStore(str(tmp_path), signature="t", resume=True)
+
+    assert not store.is_done("WEN")
+    assert os.listdir(tmp_path) == ["manifest.json"]
@@ -0,0 +1,72 @@
+from python.imports import *
+from python.scripts.functions.dedup import OBSERVATION_RULE, deduplicate
+from python.scripts.functions.schema import ingest_facts
+
+KEY = ["ticker", "label", "source_tag", "start", "end"]
+
+
+def _old_observation_dedup(df: pd.DataFrame) -> pd.DataFrame:
+    """The chain preprocess_frame ran before the dedup engine."""
+
+    # collapse_duplicates_ignoring_frame
+    df = df.sort_values(by="frame").drop_duplicates(subset=KEY, keep="first")
+
+    # deduplicate_by_latest_filing
+    df = df.sort_values(by="filed", ascending=False).drop_duplicates(subset=KEY, keep="first")
+
+    return df
+
+
+def _facts(n: int = 4000, seed: int = 0) -> pd.DataFrame:
+    """Long facts with many duplicate observations, most of them without a frame."""
+
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 200, n) * 91, unit="D")
+
+    # Frames are unique per row (or missing), as in SEC payloads
+    frame = pd.Series([f"CY{2015 + i % 10}Q{i % 4 + 1}I{i}" for i in range(n)], dtype=object)
+    frame[rng.random(n) < 0.7] = None
+
+    return pd.DataFrame({
+        "ticker": rng.choice(["AAA", "BBB", "CCC"], n),
+        "label": rng.choice(["revenue", "cogs"], n),
+        "source_tag": rng.choice(["Revenues", "SalesRevenueNet"], n),
+        "start": start,
+        "end": start + pd.Timedelta(days=90),
+        "val": rng.normal(size=n),
+        "form": rng.choice(["10-Q", "10-K"], n),
+        "filed": pd.Timestamp("2016-01-01") + pd.to_timedelta(rng.integers(0, 3000, n), unit="D"),
+        "frame": frame,
+    })
+
+
+def test_observation_rule_matches_old_chain():
+    df = _facts()
+
+    old = _old_observation_dedup(df).sort_index()
+    new = deduplicate(df, [OBSERVATION_RULE]).sort_index()
+
+    assert len(new) < len(df)
+    pd.testing.assert_frame_equal(new, old)
+
+
+def test_observation_rule_matches_old_chain_on_compact_schema():
+    df = ingest_facts(_facts(seed=1))
+
+    old = _old_observation_dedup(df).sort_index()
+    new = deduplicate(df, [OBSERVATION_RULE]).sort_index()
+
+    pd.testing.assert_frame_equal(new, old)
+
+
+def test_ties_without_frame_keep_input_order():
+    df = _facts(n=3, seed=2).assign(
+        ticker="AAA", label="revenue", source_tag="Revenues",
+        start=pd.Timestamp("2020-01-01"), end=pd.Timestamp("2020-03-31"),
+        frame=None,
+        filed=pd.to_datetime(["2020-05-01", "2021-05-01", "2020-06-01"]),
+    )
+
+    out = deduplicate(df, [OBSERVATION_RULE])
+
+    assert out.index.tolist() == [0]
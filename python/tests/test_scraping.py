@@ -0,0 +1,30 @@
+from python.imports import *
+
+import pytest
+
+import python.scripts.functions.http_cache as hc
+import python.scripts.functions.scraping as sc
+
+
+def test_get_json_without_attempts_raises_request_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(hc, "CACHE_DIR", str(tmp_path))
+
+    with pytest.raises(sc.SecRequestError, match="after 0 attempts"):
+        sc._get_json("http://127.0.0.1:9/api/xbrl/companyfacts/CIK0000000001.json", max_retries=0)
+
+
+def test_stale_tickers_treats_missing_filed_as_never_filed(monkeypatch):
+    latest = {"0000000001": "2024-05-01", "0000000002": "2024-05-01", "0000000003": "2024-05-01", "0000000004": "2024-05-01"}
+    monkeypatch.setattr(sc, "_resolve_tickers", lambda tickers: [(t, f"{i + 1:010d}") for i, t in enumerate(tickers)])
+    monkeypatch.setattr(sc, "company_submissions", lambda cik10: {
+        "filings": {"recent": {"filingDate": [latest[cik10]], "isXBRL": [1]}},
+    })
+
+    watermark = pd.DataFrame({
+        "ticker": ["AAA", "BBB", "BBB", "CCC"],
+        "source_tag": ["Revenues", "Revenues", "Assets", "Revenues"],
+        "filed": ["2024-05-01", "2023-11-01", None, None],
+        "accn": ["a", "b", "c", "d"],
+    })
+
+    assert sc.stale_tickers(["AAA", "BBB", "CCC", "DDD"], watermark) == ["BBB", "CCC", "DDD"]
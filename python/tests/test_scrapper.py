@@ -0,0 +1,50 @@
+from python.imports import *
+
+import pytest
+
+import python.scripts.scrapper as sp
+import python.scripts.functions.http_cache as hc
+import python.scripts.functions.scraping as sc
+from python.scripts.functions.coverage import CoverageIndex
+from python.scripts.functions.standin import StandinServer, SyntheticEdgar
+
+
+@pytest.fixture
+def standin(tmp_path, monkeypatch):
+    """scrapper.scrape() against a local SEC stand-in, writing only under tmp_path."""
+
+    # set_sec_host / set_cache_dir / set_rate_limit rebind module globals;
+    # registering them first lets monkeypatch restore them afterwards
+    for name in ["BASE", "SUBMISSIONS_BASE", "TICKERS_URL", "TICKERS_EXCHANGE_URL", "_LIMITER"]:
+        monkeypatch.setattr(sc, name, getattr(sc, name))
+    monkeypatch.setattr(hc, "CACHE_DIR", hc.CACHE_DIR)
+
+    monkeypatch.setattr(sc, "UA", {"User-Agent": "test test@example.com"}, raising=False)
+    monkeypatch.setattr(sp, "tickers", ["T0000", "T0001", "T0002"])
+    monkeypatch.setattr(sp, "DATA_RAW", str(tmp_path / "raw"))
+    monkeypatch.setattr(sp, "DATA_SHARDS", str(tmp_path / "raw" / "shards"))
+    monkeypatch.setattr(sp, "SCRAPE_METRICS_LOG", str(tmp_path / "scrape_metrics.jsonl"))
+    monkeypatch.setattr(sp, "RAW_DATASET", str(tmp_path / "raw" / "data_raw"))
+    monkeypatch.setattr(sp, "CoverageIndex", lambda: CoverageIndex(str(tmp_path / "coverage.json")))
+
+    with StandinServer(SyntheticEdgar(n_companies=3), latency=0.0) as srv:
+        sc.set_sec_host(srv.url)
+        sc.set_rate_limit(500, shared=False)
+        hc.set_cache_dir(str(tmp_path / "cache"))
+        yield tmp_path
+
+
+def test_scrape_without_save_stays_in_memory(standin):
+    df = sp.scrape(method="facts", save=False)
+
+    assert len(df) > 0
+    assert isinstance(df["ticker"].dtype, pd.CategoricalDtype)
+    assert not (standin / "raw" / "shards").exists()
+    assert not (standin / "raw" / "data_raw").exists()
+
+
+def test_scrape_checkpoint_writes_shards(standin):
+    df = sp.scrape(method="facts", save=False, checkpoint=True)
+
+    assert len(df) > 0
+    assert os.listdir(standin / "raw" / "shards")
@@ -0,0 +1,51 @@
+from python.imports import *
+from python.scripts.functions.schema import compact_facts
+from python.scripts.functions.storage import read_dataset, write_dataset
+
+
+def _facts() -> pd.DataFrame:
+    return compact_facts(pd.DataFrame({
+        "ticker": ["WEN", "MCD", "WEN", "YUM"],
+        "label": ["revenue", "revenue", "cogs", "revenue"],
+        "end": pd.to_datetime(["2020-03-31", "2020-03-31", "2020-06-30", "2020-06-30"]),
+        "val": [1.0, 2.0, 3.0, 4.0],
+    }))
+
+
+def test_read_dataset_returns_plain_strings_by_default(tmp_path):
+    write_dataset(_facts(), str(tmp_path / "facts"), partition_cols=["ticker"], fmt="parquet")
+
+    df = read_dataset(str(tmp_path / "facts"))
+
+    assert not isinstance(df["ticker"].dtype, pd.CategoricalDtype)
+    assert not isinstance(df["label"].dtype, pd.CategoricalDtype)
+
+
+def test_read_dataset_keeps_categories(tmp_path):
+    write_dataset(_facts(), str(tmp_path / "facts"), partition_cols=["ticker"], fmt="parquet")
+
+    df = read_dataset(
+        str(tmp_path / "facts"),
+        filters=[("ticker", "in", ["WEN", "YUM"])],
+        keep_categories=True,
+    )
+
+    for col in ["ticker", "label"]:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype)
+        assert df[col].cat.categories.is_monotonic_increasing
+
+    # Partition values filtered out are not left behind as unused categories
+    assert df["ticker"].cat.categories.tolist() == ["WEN", "YUM"]
+    assert list(df.columns) == ["ticker", "label", "end", "val"]
+
+
+def test_digit_only_partition_keys_stay_strings(tmp_path):
+    df = _facts().assign(ticker=lambda d: d["ticker"].map({"WEN": "0000030697", "MCD": "0000063908", "YUM": "0001041061"}))
+    write_dataset(df, str(tmp_path / "facts"), partition_cols=["ticker"], fmt="parquet")
+
+    plain = read_dataset(str(tmp_path / "facts"), filters=[("ticker", "==", "0000063908")])
+    compact = read_dataset(str(tmp_path / "facts"), keep_categories=True)
+
+    assert plain["ticker"].tolist() == ["0000063908"]
+    assert sorted(compact["ticker"].astype(str)) == sorted(df["ticker"].astype(str))
+    assert isinstance(compact["ticker"].dtype, pd.CategoricalDtype)
@@ -14,7 +14,14 @@ library(augsynth)
 library(fixest)
 
 # read data 
-data <-read_csv('./outputs/data.csv')
+# outputs/data.arrow (written by prepare()) is memory-mapped by arrow without a
+# parse step; fall back to the CSV when arrow is not installed
+if (requireNamespace("arrow", quietly = TRUE) && file.exists('./outputs/data.arrow')) {
+  data <- arrow::read_feather('./outputs/data.arrow', mmap = TRUE) %>%
+    mutate(ticker = as.character(ticker), time_label = as.character(time_label))
+} else {
+  data <-read_csv('./outputs/data.csv')
+}
 data_company_id <- data %>% 
   mutate(company_id = as.integer(as.factor(ticker))) %>% as.data.frame()
 